@@ -1,7 +1,19 @@
 # bot.py — TutorBot (ID-only overrides + /신규 시트검증 사양 반영)
 # KST: Asia/Seoul
 
-import os, json, re, asyncio, random, traceback
+import os, io, json, re, copy, heapq, asyncio, random, signal, traceback, types
+
+# I/O 바운드 봇이라 libuv 기반 루프가 콜백/syscall 오버헤드를 크게 줄입니다.
+# (Windows 등 미지원 환경에서는 조용히 stdlib 루프 사용)
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+from collections import defaultdict, deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from functools import lru_cache
 from typing import Dict, List, Tuple, Optional, Any, Set
 from datetime import datetime, date, timedelta, time as dtime, timezone
 def _retry_after_seconds(e) -> float | None:
@@ -165,21 +177,55 @@ _homework_lock = asyncio.Lock()
 _ready_boot_lock = asyncio.Lock()
 _post_ready_lock = asyncio.Lock()
 
-def _safe_json_dumps(x): return json.dumps(x, ensure_ascii=False, indent=2)
+# orjson이 있으면 직렬화가 훨씬 빠르고 bytes를 바로 내놓습니다(인코딩 1회 생략).
+# 없으면 stdlib json으로 동작합니다.
+try:
+    import orjson as _orjson
+except Exception:
+    _orjson = None
+
+# 저장은 핫패스이므로 pretty-print 없이 compact하게 씁니다.
+# (사람이 볼 일은 드물고, 필요하면 jq 등으로 바로 정리해 볼 수 있음)
+_JSON_WRITE_BUF = 1 << 16  # 64KiB 버퍼: 커널에 블록 크기 단위로 내려가게
+
+def _json_dump_to(f, data: Any):
+    if _orjson is not None:
+        f.write(_orjson.dumps(data, option=_orjson.OPT_NON_STR_KEYS))
+        return
+    # stdlib 폴백: 거대한 중간 문자열 없이 버퍼로 스트리밍
+    tw = io.TextIOWrapper(f, encoding="utf-8", write_through=False)
+    try:
+        json.dump(data, tw, ensure_ascii=False, separators=(",", ":"))
+        tw.flush()
+    finally:
+        tw.detach()  # f는 호출자가 닫는다
 
 def save_json_atomic(path: str, data: Any):
     tmp = path + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        f.write(_safe_json_dumps(data))
+    with open(tmp, "wb", buffering=_JSON_WRITE_BUF) as f:
+        _json_dump_to(f, data)
         try:
             f.flush(); os.fsync(f.fileno())
         except Exception:
             pass
     os.replace(tmp, path)
+    # rename 자체의 내구성 보장: 디렉터리 엔트리도 fsync 해야
+    # 전원 유실 시 교체 전 파일로 되돌아가는 일을 막습니다.
+    try:
+        dfd = os.open(os.path.dirname(os.path.abspath(path)) or ".", os.O_DIRECTORY)
+        try:
+            os.fsync(dfd)
+        finally:
+            os.close(dfd)
+    except Exception:
+        pass  # O_DIRECTORY 미지원 플랫폼(Windows) 등
 
 def load_json_with_recovery(path: str, default: Any):
     def _load(p):
-        with open(p, "r", encoding="utf-8") as f: return json.load(f)
+        # 저장과 대칭으로, 읽기도 orjson이 있으면 C 파서로
+        with open(p, "rb") as f:
+            raw = f.read()
+        return _orjson.loads(raw) if _orjson is not None else json.loads(raw)
     if not os.path.exists(path): return default
     try:
         return _load(path)
@@ -206,7 +252,7 @@ def load_local_json(path: str, default):
         print(f"[로컬 로드 실패] {path}: {e}")
         return default
 
-def load_from_firestore_or_local():
+async def load_from_firestore_or_local():
     """
     앱 시작할 때 Firestore에서 먼저 데이터를 읽어오고,
     실패하면 로컬 파일(overrides.json 등)에서 읽어옵니다.
@@ -214,11 +260,16 @@ def load_from_firestore_or_local():
     global overrides, attendance, homework
 
     # 1) Firestore가 준비돼 있으면 Firestore에서 먼저 시도
+    # 블로킹 gRPC 3건을 루프 위에서 차례로 돌리는 대신 executor에서 동시 실행:
+    # 하트비트가 막히지 않고, 로드 시간도 3 RTT → 1 RTT로 줄어듭니다.
     if _firestore_client:
         try:
-            o = firestore_get_doc("persist", "overrides", None)
-            a = firestore_get_doc("persist", "attendance", None)
-            h = firestore_get_doc("persist", "homework", None)
+            loop = asyncio.get_running_loop()
+            o, a, h = await asyncio.gather(
+                loop.run_in_executor(None, firestore_get_doc, "persist", "overrides", None),
+                loop.run_in_executor(None, firestore_get_doc, "persist", "attendance", None),
+                loop.run_in_executor(None, firestore_get_doc, "persist", "homework", None),
+            )
 
             if isinstance(o, dict):
                 overrides = o
@@ -231,10 +282,13 @@ def load_from_firestore_or_local():
                 attendance = load_local_json(ATTENDANCE_FILE, {})
 
             if isinstance(h, dict):
-                homework = h
+                homework = _hw_sets_in_memory(h)
             else:
-                homework = load_local_json(HOMEWORK_FILE, {})
+                homework = _hw_sets_in_memory(load_local_json(HOMEWORK_FILE, {}))
 
+            _bump_ov_version()
+            _ATT_SET_CACHE.clear()
+            _timetable_cache.clear()
             print("[Load] Firestore 우선 로드 완료 (없으면 로컬 사용)")
             return
         except Exception as e:
@@ -243,32 +297,116 @@ def load_from_firestore_or_local():
     # 2) Firestore를 못 쓰는 경우 → 로컬 파일에서 읽기
     overrides = load_local_json(OVERRIDE_FILE, {})
     attendance = load_local_json(ATTENDANCE_FILE, {})
-    homework = load_local_json(HOMEWORK_FILE, {})
+    homework = _hw_sets_in_memory(load_local_json(HOMEWORK_FILE, {}))
+    _bump_ov_version()
+    _ATT_SET_CACHE.clear()
+    _timetable_cache.clear()
     print("[Load] 로컬 파일 로드 완료")
 
 
+# 저장 디바운스: 이벤트가 몰릴 때(출석 러시 등) 변경마다 전체 파일을
+# 다시 쓰지 않고, 짧게 모았다가 버스트당 1회만 디스크에 내립니다.
+_SAVE_DEBOUNCE_SEC = 0.5
+_save_tasks: Dict[str, asyncio.Task] = {}
+_save_doc_tags: Dict[str, Tuple[str, str]] = {}  # path -> (doc_id, tag)
+# fsync/Firestore는 블로킹 I/O라 이벤트 루프(하트비트) 밖에서 돌립니다.
+# worker 1개 = 파일별 쓰기 순서 보존.
+_persist_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="persist")
+
+# 같은 틱에 여러 문서가 저장 대기 중이면(예: 출석+숙제 동시 변경)
+# Firestore에 문서별 set 대신 WriteBatch 1회 커밋으로 묶습니다.
+# 네트워크 바운드 작업이라 RTT 수가 곧 지연시간입니다.
+_pending_persist: Dict[str, Tuple[str, Any, str]] = {}  # doc_id -> (path, snapshot, tag)
+_persist_drain_task: Optional[asyncio.Task] = None
+
+def _persist_pending(items: Dict[str, Tuple[str, Any, str]]):
+    # persist executor에서 실행됨 (블로킹 I/O 허용)
+    if _firestore_client:
+        try:
+            batch = _firestore_client.batch()
+            for doc_id, (_path, data, _tag) in items.items():
+                batch.set(_firestore_client.collection("persist").document(doc_id), data)
+            batch.commit()
+        except Exception as e:
+            print(f"[persist 배치 오류] {type(e).__name__}: {e}")
+    # 로컬 파일은 Firestore 성패와 무관하게 항상 내립니다 (기존 동작 유지)
+    for _doc_id, (path, data, tag) in items.items():
+        try:
+            save_json_atomic(path, data)
+        except Exception as e:
+            print(f"[{tag} 로컬백업 실패] {type(e).__name__}: {e}")
+
+async def _drain_persist():
+    global _persist_drain_task
+    try:
+        while _pending_persist:
+            items = dict(_pending_persist)
+            _pending_persist.clear()
+            await asyncio.get_running_loop().run_in_executor(
+                _persist_executor, _persist_pending, items
+            )
+    finally:
+        _persist_drain_task = None
+
+def _kick_persist_drain():
+    global _persist_drain_task
+    t = _persist_drain_task
+    if t is None or t.done():
+        _persist_drain_task = asyncio.create_task(_drain_persist())
+
+def _schedule_save(doc_id: str, path: str, data_ref: Any, tag: str):
+    old = _save_tasks.get(path)
+    if old and not old.done():
+        old.cancel()
+    _save_doc_tags[path] = (doc_id, tag)  # 종료 플러시가 문서를 역추적할 수 있게
+
+    async def _delayed():
+        try:
+            await asyncio.sleep(_SAVE_DEBOUNCE_SEC)
+        except asyncio.CancelledError:
+            return
+        # 발화 시점의 최신 상태를 스냅샷 떠서 대기열에 올리고 드레인을 깨움
+        _pending_persist[doc_id] = (path, copy.deepcopy(data_ref), tag)
+        _kick_persist_drain()
+
+    _save_tasks[path] = asyncio.create_task(_delayed())
+
 async def save_overrides():
-    async with _overrides_lock:
-        _persist_json_snapshot("overrides", OVERRIDE_FILE, overrides, "save_overrides")
+    _bump_ov_version()
+    _schedule_save("overrides", OVERRIDE_FILE, overrides, "save_overrides")
 
 async def save_attendance():
-    _persist_json_snapshot("attendance", ATTENDANCE_FILE, attendance, "save_attendance")
+    _timetable_cache.clear()  # 출석 마크가 바뀌었으니 렌더 캐시 무효화
+    _schedule_save("attendance", ATTENDANCE_FILE, attendance, "save_attendance")
 
 
 async def save_homework():
-    _persist_json_snapshot("homework", HOMEWORK_FILE, homework, "save_homework")
-
-def _persist_json_snapshot(doc_id: str, path: str, data: Any, tag: str):
-    try:
-        if _firestore_client:
-            firestore_set_doc("persist", doc_id, data)
-        save_json_atomic(path, data)
-    except Exception as e:
-        print(f"[{tag} 오류] {type(e).__name__}: {e}")
-        try:
-            save_json_atomic(path, data)
-        except Exception as e2:
-            print(f"[{tag} 로컬백업 실패] {type(e2).__name__}: {e2}")
+    _timetable_cache.clear()  # 제출 마크가 바뀌었으니 렌더 캐시 무효화
+    # 메모리상 set은 JSON/Firestore에 못 실으므로 저장 직전에만 리스트로 변환
+    _schedule_save("homework", HOMEWORK_FILE, _hw_json_safe(homework), "save_homework")
+
+# 종료 시 최종 플러시용: doc_id -> 현재 상태 스냅샷 getter
+# (람다라 homework 등은 호출 시점의 최신 객체를 봅니다)
+_SAVE_GETTERS = {
+    "overrides":  lambda: overrides,
+    "attendance": lambda: attendance,
+    "homework":   lambda: _hw_json_safe(homework),
+}
+
+async def _flush_pending_saves():
+    """디바운스 대기 중인 저장을 지금 바로 내립니다 (종료 경로 전용).
+    타이머를 취소해도 쓰기 자체가 증발하지 않도록, 대기 중이던 문서의
+    현재 상태를 스냅샷 떠서 드레인을 끝까지 기다립니다."""
+    for path, t in list(_save_tasks.items()):
+        if t.done():
+            continue
+        t.cancel()
+        doc_id, tag = _save_doc_tags.get(path, (None, ""))
+        get_data = _SAVE_GETTERS.get(doc_id)
+        if get_data is not None:
+            _pending_persist[doc_id] = (path, copy.deepcopy(get_data()), tag)
+    if _pending_persist:
+        await _drain_persist()
 
 
 # ====== Time / Parse ======
@@ -277,7 +415,25 @@ _TIME_RE = re.compile(r"^\s*(\d{1,2})\s*[:시]\s*(\d{0,2})\s*(분)?\s*$")
 
 def parse_time_str(s: str) -> Optional[dtime]:
     if not isinstance(s, str): return None
-    m = _TIME_RE.match(s.strip())
+    # 학기 내 시각 문자열은 소수의 HH:MM 값이 반복되므로 캐시 적중률이 높고,
+    # dtime은 불변이라 같은 객체를 돌려줘도 안전합니다.
+    return _parse_time_str_cached(s.strip())
+
+@lru_cache(maxsize=2048)
+def _parse_time_str_cached(s: str) -> Optional[dtime]:
+    # 빠른 경로: 입력 대부분은 'HH:MM' / 'HH시MM분' / 'HH시' 꼴이라
+    # 정규식 없이 split만으로 처리합니다. 실패하면 기존 정규식 폴백.
+    h, sep, rest = s.partition(":")
+    if not sep:
+        h, sep, rest = s.partition("시")
+        if sep and rest.endswith("분"):
+            rest = rest[:-1]
+    if sep and h.isdigit() and (not rest or rest.isdigit()) and len(h) <= 2 and len(rest) <= 2:
+        hh = int(h); mm = int(rest) if rest else 0
+        if 0 <= hh <= 23 and 0 <= mm <= 59:
+            return dtime(hh, mm)
+        return None
+    m = _TIME_RE.match(s)
     if not m: return None
     hh = int(m.group(1)); mm = int(m.group(2) or 0)
     if 0 <= hh <= 23 and 0 <= mm <= 59:
@@ -294,21 +450,35 @@ def normalize_base_name(name: str) -> str:
     if not name: return name
     return re.sub(r'(-\d{4})+$', '', name).strip()
 
-def _parse_day_input(when: str) -> Optional[date]:
-    if when is None: return None
-    s = when.strip()
-    if s in ("오늘","today"): return datetime.now(KST).date()
-    if s in ("내일","tomorrow"): return datetime.now(KST).date() + timedelta(days=1)
-    if re.fullmatch(r"\d{4}-\d{1,2}-\d{1,2}", s):
+# 날짜 입력 파싱은 슬래시 명령마다 타는 경로라 토큰/정규식을 모듈에 상수화
+_TODAY_TOKENS = frozenset(("오늘", "today"))
+_TMRW_TOKENS = frozenset(("내일", "tomorrow"))
+_YMD_RE = re.compile(r"\d{4}-\d{1,2}-\d{1,2}\Z")
+_MMDD_RE = re.compile(r"\d{1,2}-\d{1,2}\Z")
+
+@lru_cache(maxsize=256)
+def _parse_day_str_cached(s: str, today_ord: int) -> Optional[date]:
+    """날짜 문자열 분기만 메모이즈. 같은 날 반복 입력되는 문자열이
+    대부분이라 (문자열, 오늘 서수) 키로 재파싱/Match 생성을 생략합니다."""
+    if _YMD_RE.match(s):
         try: return date.fromisoformat(s)
         except: return None
-    if re.fullmatch(r"\d{1,2}-\d{1,2}", s):
-        y = datetime.now(KST).year
+    if _MMDD_RE.match(s):
+        y = date.fromordinal(today_ord).year  # MM-DD는 올해로 보정
         mm, dd = s.split("-"); mm=mm.zfill(2); dd=dd.zfill(2)
         try: return date.fromisoformat(f"{y}-{mm}-{dd}")
         except: return None
     return None
 
+def _parse_day_input(when: str, *, now: Optional[datetime] = None) -> Optional[date]:
+    """now: 호출부가 이미 datetime.now(KST)를 떠놨으면 전달해 재조회 생략."""
+    if when is None: return None
+    s = when.strip()
+    now = now or datetime.now(KST)
+    if s in _TODAY_TOKENS: return now.date()
+    if s in _TMRW_TOKENS: return now.date() + timedelta(days=1)
+    return _parse_day_str_cached(s, now.toordinal())
+
 def _to_int_set(items: Any) -> Set[int]:
     out: Set[int] = set()
     if not isinstance(items, (list, tuple, set)):
@@ -320,75 +490,188 @@ def _to_int_set(items: Any) -> Set[int]:
             out.add(int(x))
     return out
 
+# 오래된 숙제 키 정리 — 최소 날짜 워터마크를 유지해, 실제로 오래된
+# 키가 생겼을 때만 전체 dict 스캔이 돌게 합니다(평소엔 no-op).
+_homework_min_date: Optional[date] = None
+
+def _note_homework_day(d: date):
+    global _homework_min_date
+    if _homework_min_date is None or d < _homework_min_date:
+        _homework_min_date = d
+
+def prune_old_homework(days: int = 60) -> int:
+    global _homework_min_date
+    cutoff = datetime.now(KST).date() - timedelta(days=days)
+    if _homework_min_date is not None and _homework_min_date >= cutoff:
+        return 0
+    removed = 0
+    min_seen: Optional[date] = None
+    for k in list(homework.keys()):
+        d = parse_date_yyyy_mm_dd(k)
+        if d is None:
+            continue
+        if d < cutoff:
+            del homework[k]
+            removed += 1
+        elif min_seen is None or d < min_seen:
+            min_seen = d
+    _homework_min_date = min_seen or cutoff
+    return removed
+
 def _extract_submitted_sids(raw: Any, *, allow_legacy_list: bool) -> Set[int]:
     if isinstance(raw, dict):
-        return _to_int_set(raw.get("submitted", []))
+        sub = raw.get("submitted", [])
+        if isinstance(sub, set):  # 메모리상 형식: 재해싱 없이 그대로 사용
+            return sub
+        return _to_int_set(sub)
     if allow_legacy_list and isinstance(raw, list):
         return _to_int_set(raw)
     return set()
 
+def _hw_sets_in_memory(h: dict) -> dict:
+    """로드 직후 submitted 리스트를 set으로 바꿔 멤버십 검사를 O(1)로.
+    (구버전 list-형식 날짜는 그대로 둬서 /숙제제출의 구형 감지를 유지)"""
+    for v in h.values():
+        if isinstance(v, dict) and isinstance(v.get("submitted"), list):
+            v["submitted"] = _to_int_set(v["submitted"])
+    return h
+
+def _hw_json_safe(h: dict) -> dict:
+    """저장용: set을 정렬 리스트로 되돌린 복사본."""
+    out = {}
+    for k, v in h.items():
+        if isinstance(v, dict) and isinstance(v.get("submitted"), set):
+            out[k] = {**v, "submitted": sorted(v["submitted"])}
+        else:
+            out[k] = v
+    return out
+
 # ====== Google Sheets ======
-import gspread
+# gspread는 miss마다 스프레드시트/워크시트 메타데이터 객체를 새로 만들어
+# 리프레시 한 번에 HTTP 왕복이 2~3회 발생합니다.
+# → Sheets API v4 values.get 하나로 줄이고 서비스 객체는 싱글톤으로 재사용합니다.
+from googleapiclient.discovery import build as _gapi_build
 from google.oauth2.service_account import Credentials
 
+_sheets_service = None
+
 def gs_client():
-    scopes = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
-    creds = Credentials.from_service_account_file(SERVICE_ACCOUNT_JSON, scopes=scopes)
-    return gspread.authorize(creds)
+    """Sheets v4 서비스 싱글톤. (cache_discovery=False: 디스커버리 캐시 I/O 생략)"""
+    global _sheets_service
+    if _sheets_service is None:
+        scopes = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
+        creds = Credentials.from_service_account_file(SERVICE_ACCOUNT_JSON, scopes=scopes)
+        _sheets_service = _gapi_build("sheets", "v4", credentials=creds, cache_discovery=False)
+    return _sheets_service
+
+def _rows_digest(rows) -> int:
+    """원본 rows를 캐시에 보관하지 않고 '내용이 바뀌었는지'만 알기 위한 해시.
+    리스트 전체를 들고 비교하는 대신 64bit 정수 하나만 유지합니다.
+    (연속 fetch 두 번의 우연한 충돌 확률은 무시 가능한 수준)"""
+    return hash(tuple(map(tuple, rows)))
 
 class SheetCache:
-    def __init__(self, ttl_seconds=90):
+    def __init__(self, ttl_seconds=90, min_interval=1.0):
         self.ttl = ttl_seconds
-        self._rows = None
+        self._min_interval = min_interval   # 연속 fetch 최소 간격 (쿼터 보호)
+        self._digest = None    # 마지막 fetch 내용의 해시 (rows 자체는 버림)
         self._parsed = None
         self._ts = 0.0
+        self._last_fetch = 0.0
         self._lock = asyncio.Lock()
 
-    async def get_rows(self):
+    async def get_parsed(self):
+        # 주의: 락을 쥔 채로 sleep/fetch를 await 하면 뒤따르는 호출자가
+        # 전부 직렬로 묶입니다. 대기/네트워크는 락 밖에서 수행합니다.
         loop = asyncio.get_running_loop()
-        now = loop.time()
-        if self._rows is not None and (now - self._ts) <= self.ttl:
-            return self._rows
+        if self._parsed is not None and (loop.time() - self._ts) <= self.ttl:
+            return self._parsed
+        while True:
+            wait = 0.0
+            async with self._lock:
+                now = loop.time()
+                if self._parsed is not None and (now - self._ts) <= self.ttl:
+                    return self._parsed
+                since = now - self._last_fetch
+                if since < self._min_interval:
+                    wait = self._min_interval - since
+                else:
+                    self._last_fetch = now  # fetch 슬롯 선점
+            if wait > 0.0:
+                await asyncio.sleep(wait)
+                continue  # 자는 사이 다른 호출자가 채웠을 수 있으니 재확인
+
+            def _fetch():
+                svc = gs_client()
+                resp = svc.spreadsheets().values().get(
+                    spreadsheetId=SHEET_ID, range=SHEET_NAME
+                ).execute()
+                rows = resp.get("values", [])
+                return _rows_digest(rows), rows  # 해시는 executor 스레드에서
+            digest, rows = await loop.run_in_executor(None, _fetch)
+
+            async with self._lock:
+                self._absorb(digest, rows)
+                return self._parsed
+
+    def _absorb(self, digest: int, rows):
+        # 내용이 그대로면 파싱 결과(객체 동일성 포함)를 유지하고 TTL만 연장.
+        # rows는 여기서 스코프를 벗어나며 해제 — 파싱본만 상주합니다.
+        if digest != self._digest or self._parsed is None:
+            self._parsed = parse_schedule_single_sheet(rows)
+            self._digest = digest
+        self._ts = asyncio.get_running_loop().time()
+
+    async def warmup(self, extra_ranges: Optional[List[str]] = None):
+        """values.batchGet 한 번으로 캐시를 미리 채웁니다.
+        시트가 늘어나면 extra_ranges로 같은 호출에 묶어 왕복을 아낍니다."""
+        loop = asyncio.get_running_loop()
+        ranges = [SHEET_NAME] + list(extra_ranges or [])
         async with self._lock:
-            if self._rows is not None and (loop.time() - self._ts) <= self.ttl:
-                return self._rows
             def _fetch():
-                gc = gs_client()
-                ws = gc.open_by_key(SHEET_ID).worksheet(SHEET_NAME)
-                return ws.get_all_values()
-            rows = await loop.run_in_executor(None, _fetch)
-            self._rows = rows
-            self._parsed = None
-            self._ts = loop.time()
-            return rows
-
-    async def get_parsed(self):
-        now = asyncio.get_running_loop().time()
-        if self._parsed is not None and (now - self._ts) <= self.ttl:
+                svc = gs_client()
+                resp = svc.spreadsheets().values().batchGet(
+                    spreadsheetId=SHEET_ID, ranges=ranges
+                ).execute()
+                return [vr.get("values", []) for vr in resp.get("valueRanges", [])]
+            value_ranges = await loop.run_in_executor(None, _fetch)
+            rows = value_ranges[0] if value_ranges else []
+            self._absorb(_rows_digest(rows), rows)
             return self._parsed
-        rows = await self.get_rows()
-        self._parsed = parse_schedule_single_sheet(rows)
-        return self._parsed
 
 SHEET_CACHE = SheetCache(90)
 
+def _empty_schedule():
+    return {"students": {}, "by_weekday": [[] for _ in range(7)]}
+
 def parse_schedule_single_sheet(rows):
     """
     Header 예:
       학생 이름 | discord_id | (요일|시간)* | ... | 서비스 시작일 | 서비스 종료일
     반환:
-      { key: {"name":str,"id":int|None,"pairs":[(요일,dtime)],"start_raw":str,"end_raw":str} }
+      {
+        "students":   { key: {"name":str,"id":int|None,"pairs":[(요일,dtime)],
+                              "start_raw":str,"end_raw":str,
+                              "start_date":date|None,"end_date":date|None,"end_eff":date|None} },
+        "by_weekday": [ [(key, [dtime,...])...] x7 ]   # 요일별 기본 수업 인덱스
+      }
+    by_weekday 덕분에 세션 계산이 요일 버킷만 읽으면 되어
+    전체 학생×pairs 재순회(특히 30일 스캔)가 없어집니다.
     """
-    if not rows: return {}
+    if not rows: return _empty_schedule()
     header = [h.strip() for h in rows[0]]
     if "학생 이름" in header: name_idx = header.index("학생 이름")
     elif "이름" in header:    name_idx = header.index("이름")
-    else: return {}
+    else: return _empty_schedule()
     id_idx    = header.index("discord_id")     if "discord_id" in header else None
     start_idx = header.index("서비스 시작일")    if "서비스 시작일" in header else None
     end_idx   = header.index("서비스 종료일")    if "서비스 종료일" in header else None
 
     data = {}
+    by_weekday: List[List[Tuple[str, List[dtime]]]] = [[] for _ in range(7)]
+    # 셀당 한 번씩 타는 이름들은 루프 밖에서 지역 바인딩 (글로벌/속성 조회 생략)
+    _wd_get = WEEKDAY_MAP.get
+    _pt = _parse_time_str_cached  # t_raw는 이미 strip된 str — 래퍼 생략
     for ridx, r in enumerate(rows[1:], start=1):
         if not r or len(r) <= name_idx: continue
         name = (r[name_idx] or "").strip()
@@ -403,28 +686,52 @@ def parse_schedule_single_sheet(rows):
 
         start_col = max(name_idx, id_idx if id_idx is not None else -1) + 1
         pairs: List[Tuple[str, dtime]] = []
+        pair_wds: List[int] = []  # pairs와 같은 순서의 요일 int (재해시 방지)
         for i in range(start_col, len(r), 2):
             if i+1 >= len(r): break
             day_lbl = (r[i] or "").strip()
             t_raw   = (r[i+1] or "").strip()
             if not day_lbl or not t_raw: continue
-            if day_lbl not in WEEKDAY_MAP: break
-            t = parse_time_str(t_raw)
-            if t: pairs.append((day_lbl, t))
+            wd_i = _wd_get(day_lbl)
+            if wd_i is None: break
+            # 유효한 시각은 전부 숫자로 시작 — 잡문자 셀은 파서/캐시를 건드리지 않음
+            if not t_raw[0].isdigit(): continue
+            t = _pt(t_raw)
+            if t:
+                pairs.append((day_lbl, t))
+                pair_wds.append(wd_i)
 
         start_raw = (r[start_idx].strip() if (start_idx is not None and len(r) > start_idx) else "") if start_idx is not None else ""
         end_raw   = (r[end_idx].strip()   if (end_idx   is not None and len(r) > end_idx)   else "") if end_idx   is not None else ""
 
+        # 서비스 기간은 여기서 한 번만 date로 파싱합니다.
+        # (매 세션 계산·30일 스캔마다 fromisoformat을 다시 돌리지 않도록)
+        sd = parse_date_yyyy_mm_dd(start_raw)
+        ed = parse_date_yyyy_mm_dd(end_raw)
+        end_eff = (ed or (sd + timedelta(days=28))) if sd else None  # 종료일 없으면 28일 규칙
+
         key = str(did) if isinstance(did, int) else f"{name}#row{ridx}"
-        data[key] = {"name": name, "id": did, "pairs": pairs, "start_raw": start_raw, "end_raw": end_raw}
-    return data
+        data[key] = {
+            "name": name, "id": did, "pairs": pairs,
+            "wds": frozenset(pair_wds),  # 수업 요일 집합 (날짜 스캔용 O(1) 판정)
+            "start_raw": start_raw, "end_raw": end_raw,
+            "start_date": sd, "end_date": ed, "end_eff": end_eff,
+        }
+
+        wd_times: Dict[int, List[dtime]] = {}
+        for wd_i, (_d_lbl, t) in zip(pair_wds, pairs):
+            wd_times.setdefault(wd_i, []).append(t)
+        for wd, times in wd_times.items():
+            times.sort(key=lambda x: (x.hour, x.minute))
+            by_weekday[wd].append((key, times))
+    return {"students": data, "by_weekday": by_weekday}
 
 # 이름↔ID 빠른 조회(검증용)
 STUDENT_ID_MAP: Dict[str, int] = {}
 def _rebuild_name_id_maps(parsed: Dict[str, Any]):
     name_to_id = {}
     id_to_name = {}
-    for v in parsed.values():
+    for v in parsed.get("students", {}).values():
         nm = v.get("name")
         sid = v.get("id")
         if nm and isinstance(sid, int):
@@ -443,31 +750,171 @@ async def refresh_student_id_map():
 
 
 # ====== Label / Guild utils ======
+# 길드×멤버 전수 스캔 대신 SID→Member 스냅샷을 유지합니다.
+# (라벨/채널 조회가 집계 1회에 학생 수만큼 불리므로)
+_MEMBER_CACHE: Dict[int, "discord.Member"] = {}
+
+def _refresh_member_cache():
+    _MEMBER_CACHE.clear()
+    for g in bot.guilds:
+        for m in g.members:
+            _MEMBER_CACHE[m.id] = m
+
+def _member_for(sid: Optional[int]) -> Optional["discord.Member"]:
+    if not isinstance(sid, int):
+        return None
+    m = _MEMBER_CACHE.get(sid)
+    if m is not None:
+        return m
+    for g in bot.guilds:  # 캐시 미스 폴백 (이벤트 누락 대비)
+        m = g.get_member(sid)
+        if m:
+            _MEMBER_CACHE[sid] = m
+            return m
+    return None
+
+@bot.event
+async def on_member_join(member: "discord.Member"):
+    _MEMBER_CACHE[member.id] = member
+
+@bot.event
+async def on_member_remove(member: "discord.Member"):
+    _MEMBER_CACHE.pop(member.id, None)
+
+@bot.event
+async def on_member_update(before: "discord.Member", after: "discord.Member"):
+    _MEMBER_CACHE[after.id] = after
+
+# 토픽의 SID:<id> 태그로 SID→텍스트채널을 미리 인덱싱해 두면
+# _find_student_text_channel_by_id가 카테고리 전수 스캔 없이 바로 맞춥니다.
+_SID_TOPIC_RE = re.compile(r"SID:(\d+)")
+
+# (카테고리 id, 채널명) → 채널 id 메모 (discord.utils.get 선형 탐색 제거)
+# discord.py 모델은 __slots__라 weakref를 못 걸어 id로 캐싱합니다.
+_CAT_TEXT_CACHE: Dict[Tuple[int, str], int] = {}
+
+def _text_in_category(cat, name: str = TEXT_NAME) -> Optional[discord.TextChannel]:
+    key = (cat.id, name)
+    cid = _CAT_TEXT_CACHE.get(key)
+    if cid:
+        ch = bot.get_channel(cid)
+        if isinstance(ch, discord.TextChannel) and ch.category_id == cat.id:
+            return ch
+        _CAT_TEXT_CACHE.pop(key, None)
+    for c in cat.text_channels:
+        if c.name == name:
+            _CAT_TEXT_CACHE[key] = c.id
+            return c
+    return None
+
+def _index_channel_topic(ch):
+    if not isinstance(ch, discord.TextChannel):
+        return
+    m = _SID_TOPIC_RE.search(ch.topic or "")
+    if m:
+        _student_text_channel_cache[int(m.group(1))] = ch.id
+
+def _index_guild_channels():
+    for g in bot.guilds:
+        for cat in g.categories:
+            for tx in cat.text_channels:
+                _index_channel_topic(tx)
+
+@bot.event
+async def on_guild_channel_create(channel):
+    _index_channel_topic(channel)
+    _CAT_TEXT_CACHE.clear()
+
+@bot.event
+async def on_guild_channel_update(before, after):
+    _index_channel_topic(after)
+    _CAT_TEXT_CACHE.clear()
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    cid = getattr(channel, "id", None)
+    for sid, known in list(_student_text_channel_cache.items()):
+        if known == cid:
+            _student_text_channel_cache.pop(sid, None)
+    if cid == SITUATION_ROOM_CHANNEL_ID:
+        bot._situation_room = None
+    _CAT_TEXT_CACHE.clear()
+
 def _label_from_guild_or_default(name: str, sid: Optional[int]) -> str:
     if isinstance(sid, int):
-        for g in bot.guilds:
-            m = g.get_member(sid)
-            if m: return (m.display_name or m.nick or name)
+        m = _member_for(sid)
+        if m: return (m.display_name or m.nick or name)
         return f"{name}-{str(sid)[-4:]}"
     return name
 
+# fetch_channel/fetch_user는 HTTP 왕복이라 스케줄러 틱마다 나가면 곤란합니다.
+# 내부 캐시(get_*) 미스일 때만 fetch하고, 그 결과도 TTL로 들고 있습니다.
+# 실패(없음/권한오류)도 짧은 TTL로 네거티브 캐싱해 반복 404 왕복을 막습니다.
+_FETCH_CACHE_TTL = 60.0
+_FETCH_NEG_TTL = 30.0
+_CH_FETCH_CACHE: Dict[int, Tuple[float, Optional[discord.TextChannel]]] = {}
+_USER_FETCH_CACHE: Dict[int, Tuple[float, Optional[discord.User]]] = {}
+
+def _fetch_cache_hit(cache: dict, key: int, now: float):
+    """(찾음여부, 값). 양성/음성 TTL을 구분해 판정합니다."""
+    hit = cache.get(key)
+    if not hit:
+        return False, None
+    age = now - hit[0]
+    if hit[1] is not None and age <= _FETCH_CACHE_TTL:
+        return True, hit[1]
+    if hit[1] is None and age <= _FETCH_NEG_TTL:
+        return True, None
+    return False, None
+
+def _clear_fetch_caches():
+    _CH_FETCH_CACHE.clear()
+    _USER_FETCH_CACHE.clear()
+
 async def _get_text_channel_cached(cid: Optional[int]) -> Optional[discord.TextChannel]:
     if not cid: return None
     ch = bot.get_channel(cid)
     if isinstance(ch, discord.TextChannel): return ch
+    now = asyncio.get_running_loop().time()
+    found, cached = _fetch_cache_hit(_CH_FETCH_CACHE, cid, now)
+    if found:
+        return cached
     try:
         ch = await bot.fetch_channel(cid)
-        return ch if isinstance(ch, discord.TextChannel) else None
+        ch = ch if isinstance(ch, discord.TextChannel) else None
     except Exception:
-        return None
+        ch = None
+    _CH_FETCH_CACHE[cid] = (now, ch)
+    return ch
 
 async def _get_user_cached(uid: Optional[int]) -> Optional[discord.User]:
     if not uid: return None
     u = bot.get_user(uid)
     if u: return u
-    try: return await bot.fetch_user(uid)
+    now = asyncio.get_running_loop().time()
+    found, cached = _fetch_cache_hit(_USER_FETCH_CACHE, uid, now)
+    if found:
+        return cached
+    try:
+        u = await bot.fetch_user(uid)
     except Exception:
-        return None
+        u = None
+    _USER_FETCH_CACHE[uid] = (now, u)
+    return u
+
+def _build_sid_to_channel_map() -> Dict[int, discord.TextChannel]:
+    """토픽 SID 태그 기준 SID→텍스트채널 맵을 길드 1회 순회로 구성.
+    리마인더처럼 N명을 한 번에 도는 배치에서 학생마다
+    _find_student_text_channel_by_id의 미스-스캔(O(C))을 반복하지 않기 위한 용도."""
+    out: Dict[int, discord.TextChannel] = {}
+    for g in bot.guilds:
+        for tx in g.text_channels:
+            m = _SID_TOPIC_RE.search(tx.topic or "")
+            if m:
+                sid = int(m.group(1))
+                out[sid] = tx
+                _student_text_channel_cache[sid] = tx.id
+    return out
 
 def _find_student_text_channel_by_id(student_id: Optional[int], fallback_name: str) -> Optional[discord.TextChannel]:
     if not isinstance(student_id, int): return None
@@ -479,31 +926,79 @@ def _find_student_text_channel_by_id(student_id: Optional[int], fallback_name: s
             return cached
         _student_text_channel_cache.pop(student_id, None)
 
-    for g in bot.guilds:
-        m = g.get_member(student_id)
-        if not m: continue
-        # 1) 카테고리명: 표시명 + " 채널"
-        disp = (m.display_name or m.nick or fallback_name)
-        cat_name = f"{disp}{CATEGORY_SUFFIX}"
-        cat = discord.utils.get(g.categories, name=cat_name)
-        if cat:
-            text = discord.utils.get(cat.text_channels, name=TEXT_NAME) or (cat.text_channels[0] if cat.text_channels else None)
-            if text:
-                _student_text_channel_cache[student_id] = text.id
-                return text
-        # 2) 토픽에 SID:<id> 표시된 텍스트 채널
-        sid_tag = f"SID:{student_id}"
-        for cat in g.categories:
-            for tx in cat.text_channels:
-                try:
-                    if (tx.topic or "").find(sid_tag) != -1:
-                        _student_text_channel_cache[student_id] = tx.id
-                        return tx
-                except Exception:
-                    continue
+    m = _member_for(student_id)
+    if not m:
+        return None
+    g = m.guild
+    # 1) 카테고리명: 표시명 + " 채널"
+    disp = (m.display_name or m.nick or fallback_name)
+    cat_name = f"{disp}{CATEGORY_SUFFIX}"
+    cat = discord.utils.get(g.categories, name=cat_name)
+    if cat:
+        text = _text_in_category(cat) or (cat.text_channels[0] if cat.text_channels else None)
+        if text:
+            _student_text_channel_cache[student_id] = text.id
+            return text
+    # 2) 토픽에 SID:<id> 표시된 텍스트 채널
+    sid_tag = f"SID:{student_id}"
+    for cat in g.categories:
+        for tx in cat.text_channels:
+            try:
+                if (tx.topic or "").find(sid_tag) != -1:
+                    _student_text_channel_cache[student_id] = tx.id
+                    return tx
+            except Exception:
+                continue
     return None
 
 # ====== OVERRIDES (ID-only) ======
+# overrides JSON은 읽기(스케줄 계산)가 쓰기보다 훨씬 잦으므로,
+# 시간 문자열을 dtime으로 파싱한 형태를 버전 태그와 함께 캐싱합니다.
+_ov_version = 0
+_OV_PARSED_CACHE: Dict[str, Tuple[int, dict]] = {}  # day_iso -> (version, {sid_str: entry})
+
+def _bump_ov_version():
+    global _ov_version
+    _ov_version += 1
+    _OV_PARSED_CACHE.clear()
+
+def _ov_parsed_day(day_iso: str) -> dict:
+    """해당 날짜 overrides의 파싱된 형태(ID키만):
+    { sid_str: {"cancel":bool, "change":dtime|None, "changes":[(dtime,dtime)], "makeup":[dtime]} }"""
+    raw = overrides.get(day_iso)
+    if not isinstance(raw, dict):
+        return {}
+    hit = _OV_PARSED_CACHE.get(day_iso)
+    if hit is not None and hit[0] == _ov_version:
+        return hit[1]
+    parsed_day: Dict[str, dict] = {}
+    for k, e in raw.items():
+        if not (isinstance(k, str) and k.isdigit() and isinstance(e, dict)):
+            continue
+        changes = []
+        for it in (e.get("changes") or []):
+            if isinstance(it, dict):
+                tf = parse_time_str(str(it.get("from")))
+                tt = parse_time_str(str(it.get("to")))
+                if tf and tt:
+                    changes.append((tf, tt))
+        ch = e.get("change")
+        change = parse_time_str(str(ch)) if ch is not None else None
+        makeup = []
+        for a in (e.get("makeup") or []):
+            ta = parse_time_str(str(a))
+            if ta and ta not in makeup:  # 여기서 한 번 dedup — 소비자는 다시 set을 만들 필요 없음
+                makeup.append(ta)
+        makeup.sort(key=lambda t: (t.hour, t.minute))
+        parsed_day[k] = {
+            "cancel": bool(e.get("cancel")),
+            "change": change,
+            "changes": changes,
+            "makeup": makeup,
+        }
+    _OV_PARSED_CACHE[day_iso] = (_ov_version, parsed_day)
+    return parsed_day
+
 def _ensure_day_bucket(day_iso: str) -> dict:
     b = overrides.get(day_iso)
     if not isinstance(b, dict):
@@ -518,10 +1013,11 @@ def _ov_get_id(ovs_day: dict, sid: Optional[int]) -> Optional[dict]:
 def _ov_get_or_create_id(ovs_day: dict, sid: Optional[int]) -> dict:
     if not isinstance(sid, int):
         raise ValueError("SID가 필요합니다(ID-only 정책).")
-    e = ovs_day.get(str(sid))
+    skey = str(sid)  # int→str 변환은 한 번만
+    e = ovs_day.get(skey)
     if isinstance(e, dict): return e
     e = {"cancel": False, "change": None, "changes": [], "makeup": []}
-    ovs_day[str(sid)] = e
+    ovs_day[skey] = e
     return e
 
 def ov_set_cancel_id(ovs_day: dict, sid: int, flag: bool) -> dict:
@@ -556,10 +1052,11 @@ def ov_add_makeup_id(ovs_day: dict, sid: int, t: Any) -> dict:
     return e
 
 def _cleanup_entry_if_empty_id(ovs_day: dict, sid: int):
-    e = ovs_day.get(str(sid))
+    skey = str(sid)
+    e = ovs_day.get(skey)
     if not isinstance(e, dict): return
     if (not e.get("cancel")) and (e.get("change") is None) and (not e.get("changes")) and (not e.get("makeup")):
-        try: del ovs_day[str(sid)]
+        try: del ovs_day[skey]
         except Exception: pass
 
 # ---- Migration: 이름키 제거/이관 ----
@@ -613,69 +1110,131 @@ async def effective_sessions_for(day: date, parsed: Optional[Dict[str, Any]] = N
     - overrides: **ID키만** 반영 (이름키는 무시)
     """
     base = parsed or await SHEET_CACHE.get_parsed()
+    return effective_sessions_for_sync(day, base)
+
+# 하루치 세션 계산 결과 캐시: 스케줄러/리마인더가 같은 날을 반복 조회할 때
+# 재계산하지 않습니다. override 버전·시트 파싱 객체가 바뀌면 자동 무효.
+_SESSIONS_TTL = 300.0
+_sessions_cache: Dict[str, Tuple[float, int, Any, list]] = {}
+
+async def effective_sessions_for_cached(day: date):
+    loop = asyncio.get_running_loop()
+    parsed = await SHEET_CACHE.get_parsed()
+    key = day.isoformat()
+    now = loop.time()
+    hit = _sessions_cache.get(key)
+    if hit and (now - hit[0]) < _SESSIONS_TTL and hit[1] == _ov_version and hit[2] is parsed:
+        return hit[3]
+    sessions = effective_sessions_for_sync(day, parsed)
+    _sessions_cache[key] = (now, _ov_version, parsed, sessions)
+    return sessions
+
+def effective_sessions_for_sync(day: date, base: Dict[str, Any]):
+    """effective_sessions_for의 동기 본체.
+    여러 날짜를 훑는 루프(/숙제의 31일 스캔 등)는 parsed를 한 번 받아
+    이 함수를 직접 호출해 날짜당 await를 없앱니다.
+    전체 학생을 훑지 않고 by_weekday[요일] 버킷 + 당일 override 키만 봅니다."""
+    students = base.get("students", {})
+    by_weekday = base.get("by_weekday") or [[] for _ in range(7)]
     wd = day.weekday()
     day_iso = day.isoformat()
-    ovs_day = overrides.get(day_iso, {}) if isinstance(overrides.get(day_iso, {}), dict) else {}
+    ovs_day = _ov_parsed_day(day_iso)  # dtime으로 파싱된 override (버전 캐시)
 
     result = []
-    for info in base.values():
+
+    def _emit(skey: str, info, base_times: List[dtime]):
         name = info.get("name") or "학생"
         sid  = info.get("id")   # 중요: None이면 override 반영 불가
-        pairs: List[Tuple[str, dtime]] = info.get("pairs", [])
-        times = [t for (d_lbl, t) in pairs if WEEKDAY_MAP.get(d_lbl) == wd]
-
-        # 서비스 기간
-        sd = parse_date_yyyy_mm_dd(info.get("start_raw") or "")
-        ed = parse_date_yyyy_mm_dd(info.get("end_raw") or "")
-        if sd is None:
-            times = []
-        else:
-            ed2 = ed or (sd + timedelta(days=28))
-            if not (sd <= day <= ed2):
-                times = []
-
-        # overrides(ID만)
-        e = _ov_get_id(ovs_day, sid)
+        # 변경/보강 적용 구간은 set으로 다뤄 remove/in이 O(1)이 되게 합니다.
+        times: Set[dtime] = set(base_times)
+
+        # 서비스 기간 (파싱 시점에 계산해 둔 date 객체 사용)
+        sd = info.get("start_date")
+        ed2 = info.get("end_eff")
+        if sd is None or not (sd <= day <= ed2):
+            times = set()
+
+        # overrides(ID만) — 이미 dtime으로 파싱된 엔트리.
+        # students 키를 그대로 조회 키로 써서 학생당 str(sid)/isinstance를 생략.
+        # (ovs_day 키는 전부 숫자 문자열이라 ID 없는 학생 키는 자연히 미스)
+        e = ovs_day.get(skey)
         if e:
             # 복수 변경
-            chg = e.get("changes")
-            if isinstance(chg, list) and chg:
-                new_times = set(times)
-                for it in chg:
-                    tf = parse_time_str(str(it.get("from")))
-                    tt = parse_time_str(str(it.get("to")))
-                    if tf and tt and tf in new_times:
-                        new_times.discard(tf); new_times.add(tt)
-                times = sorted(new_times, key=lambda t:(t.hour,t.minute))
+            for tf, tt in e["changes"]:
+                if tf in times:
+                    times.discard(tf); times.add(tt)
             # 단일 변경
-            ch = e.get("change")
-            if ch is not None:
-                tch = parse_time_str(str(ch))
-                if tch: times = [tch]
+            if e["change"] is not None:
+                times = {e["change"]}
             # 보강
-            adds = e.get("makeup") or []
-            for a in adds:
-                ta = parse_time_str(str(a))
-                if ta and ta not in times:
-                    times.append(ta)
+            for ta in e["makeup"]:
+                times.add(ta)
             # 휴강
-            if e.get("cancel"):
-                times = []
+            if e["cancel"]:
+                times = set()
 
         for t in sorted(times, key=lambda x:(x.hour,x.minute)):
             result.append((name, t, sid))
+
+    seen_keys = set()
+    for key, times in by_weekday[wd]:
+        info = students.get(key)
+        if info is None:
+            continue
+        seen_keys.add(key)
+        _emit(key, info, times)
+
+    # 이 요일 기본 수업은 없지만 override(보강 등)가 걸린 학생
+    for k in ovs_day.keys():
+        if isinstance(k, str) and k.isdigit() and k not in seen_keys:
+            info = students.get(k)
+            if info is not None:
+                _emit(k, info, [])
     return result
 
+def _student_has_session_on(day: date, uid: int, base: Dict[str, Any]) -> bool:
+    """특정 학생이 해당 날짜에 수업이 있는지 O(1) 판정.
+    /숙제의 31일 스캔이 날짜마다 세션 전체를 만들 필요가 없도록,
+    effective_sessions_for_sync의 규칙(서비스 기간·변경·보강·휴강)만 따라갑니다."""
+    skey = str(uid)
+    students = base.get("students", {})
+    e = _ov_parsed_day(day.isoformat()).get(skey)
+    if e:
+        if e["cancel"]:
+            return False
+        # 보강/변경이 세션을 만드는 건 시트에 있는 학생뿐 —
+        # effective_sessions_for_sync의 override 루프도 students에 없으면 건너뜁니다.
+        if skey in students and (e["makeup"] or e["change"] is not None):
+            return True
+    info = students.get(skey)
+    if not info:
+        return False
+    sd = info.get("start_date")
+    ee = info.get("end_eff")
+    if sd is None or not (sd <= day <= ee):
+        return False
+    return day.weekday() in info.get("wds", ())
+
 # ====== Summary / Posting ======
 async def send_long(dest, text: str, max_len: int = 1990):
-    buf = ""
+    # 먼저 청크를 전부 만들고 순서대로 보냅니다. 디스코드는 도착 순으로
+    # 쌓이므로 같은 채널에 병렬 전송하면 집계가 뒤섞여 보입니다.
+    # 문자열 누적(buf += ...) 대신 줄 리스트 + 길이 카운터로 모아
+    # 청크당 join 한 번만 수행합니다.
+    chunks: List[str] = []
+    cur: List[str] = []
+    cur_len = 0
     for line in (text or "").splitlines():
-        add = line + "\n"
-        if len(buf) + len(add) > max_len:
-            await dest.send(buf); buf = ""
-        buf += add
-    if buf.strip():
-        await dest.send(buf)
+        add = len(line) + 1  # "\n" 포함
+        if cur and cur_len + add > max_len:
+            chunks.append("\n".join(cur))
+            cur = []; cur_len = 0
+        cur.append(line)
+        cur_len += add
+    if cur and any(l.strip() for l in cur):
+        chunks.append("\n".join(cur))
+    for c in chunks:
+        await dest.send(c)
 
 async def send_long_message(inter: discord.Interaction, text: str, *, ephemeral: bool = False):
     """디스코드 2000자 제한을 피하기 위해 메시지를 여러 개로 나눠 보내는 헬퍼 함수."""
@@ -704,47 +1263,76 @@ async def send_long_message(inter: discord.Interaction, text: str, *, ephemeral:
         rest = rest[limit:]
         await inter.followup.send(chunk, ephemeral=ephemeral)
 
+# 출석 집합: 집계가 자주 불려도 day별 frozenset은 한 번만 만듭니다.
+# 출석은 append만 있으므로 리스트 길이로 신선도를 판정합니다.
+_ATT_SET_CACHE: Dict[str, Tuple[int, frozenset]] = {}
+
+def _attended_set(day_iso: str) -> frozenset:
+    lst = attendance.get(day_iso, [])
+    cached = _ATT_SET_CACHE.get(day_iso)
+    if cached and cached[0] == len(lst):
+        return cached[1]
+    s = frozenset(lst)
+    _ATT_SET_CACHE[day_iso] = (len(lst), s)
+    return s
+
+# /시간표·/로그·집계 재게시가 연달아 같은 날짜를 렌더링하는 일이 잦아
+# 완성 문자열을 짧은 TTL로 재사용합니다. overrides는 버전으로,
+# 시트는 parsed 동일성으로, 출석/숙제는 save_* 훅의 clear로 무효화됩니다.
+_TIMETABLE_TTL = 30.0
+_timetable_cache: Dict[str, Tuple[float, int, Any, str]] = {}  # day_iso -> (ts, ov버전, parsed, text)
+
 async def build_timetable_message(day: date) -> str:
     day_iso = day.isoformat()
     parsed = await SHEET_CACHE.get_parsed()
 
+    nowm = asyncio.get_running_loop().time()
+    hit = _timetable_cache.get(day_iso)
+    if hit and (nowm - hit[0]) <= _TIMETABLE_TTL and hit[1] == _ov_version and hit[2] is parsed:
+        return hit[3]
+
+    students = parsed.get("students", {})
+    by_weekday = parsed.get("by_weekday") or [[] for _ in range(7)]
+
     # ✅ D-day용 맵: 서비스 종료일이 있는 모든 학생
-    dday_map: Dict[int, int] = {}      # sid -> 남은 일수 (0이면 D-DAY)
+    # 태그 문자열까지 여기서 만들어 두면 세션 줄마다 분기/포맷이 없습니다.
+    dday_map: Dict[int, str] = {}      # sid -> " (D-7)" / " (D-DAY)"
+    for info in students.values():
+        ed = info.get("end_date")
+        if ed is None:  # 종료일 없는 학생은 문자열 작업 전에 걸러냄
+            continue
+        sid = info.get("id")
+        if not isinstance(sid, int):
+            continue
+        sd = info.get("start_date")
+        ed2 = info.get("end_eff")
+        if sd is None or not (sd <= day <= ed2):
+            continue
+        remain = (ed - day).days
+        if remain >= 0:  # 종료일 이후면 D-day 표기 안 함 (설계 선택, 추측입니다)
+            dday_map[sid] = " (D-DAY)" if remain == 0 else f" (D-{remain})"
 
-    # 기본 수업(서비스기간 반영)
+    # 기본 수업(서비스기간 반영) — 요일 버킷만 순회
     wd = day.weekday()
     base_on_day: Dict[int, Tuple[str, List[dtime]]] = {}  # sid -> (name, times)
-    for info in parsed.values():
+    for key, times in by_weekday[wd]:
+        info = students.get(key)
+        if info is None:
+            continue
         name = info.get("name") or "학생"
         sid  = info.get("id")
         if not isinstance(sid, int):  # ID 없는 행은 운영 기준에서 제외
             continue
-        sd = parse_date_yyyy_mm_dd(info.get("start_raw") or "")
-        ed = parse_date_yyyy_mm_dd(info.get("end_raw") or "")
-        if sd is None:
+        sd = info.get("start_date")
+        ed2 = info.get("end_eff")
+        if sd is None or not (sd <= day <= ed2):
             continue
-        ed2 = ed or (sd + timedelta(days=28))
-        if not (sd <= day <= ed2):
-            continue
-
-        # ⏰ D-day 계산 (서비스 종료일이 있는 학생 전체)
-        if ed is not None:
-            remain = (ed - day).days
-            if remain >= 0:  # 종료일 이후면 D-day 표기 안 함 (설계 선택, 추측입니다)
-                dday_map[sid] = remain
-
-        pairs = info.get("pairs", [])
-        times = sorted(
-            [t for (d_lbl, t) in pairs if WEEKDAY_MAP.get(d_lbl) == wd],
-            key=lambda x: (x.hour, x.minute),
-        )
         if times:
-            base_on_day[sid] = (name, times)
+            base_on_day[sid] = (name, list(times))
 
-    # overrides — **ID 키만** 집계
-    ovs_day = overrides.get(day_iso, {}) if isinstance(overrides.get(day_iso, {}), dict) else {}
-    sid_keys = [int(k) for k in ovs_day.keys() if isinstance(k, str) and k.isdigit()]
-    display_sids = set(base_on_day.keys()) | set(sid_keys)
+    # overrides — **ID 키만** 집계 (파싱 캐시 사용)
+    ovs_day = _ov_parsed_day(day_iso)
+    display_sids = set(base_on_day.keys()) | {int(k) for k in ovs_day.keys()}
 
     def _tl(t: dtime) -> str:
         return t.strftime("%H:%M")
@@ -752,85 +1340,66 @@ async def build_timetable_message(day: date) -> str:
     changed_lines, makeup_lines, canceled_lines = [], [], []
 
     for sid in sorted(display_sids):
-        e = _ov_get_id(ovs_day, sid)
+        e = ovs_day.get(str(sid))
         if not e:
             continue
-        # 라벨
-        base_name = (base_on_day.get(sid, ("학생", []))[0])
+        # 라벨 — ID 행은 students가 str(sid) 키라 그 자체가 by-id 인덱스입니다
+        hit = base_on_day.get(sid)
+        if hit is not None:
+            base_name = hit[0]
+        else:
+            info = students.get(str(sid))
+            base_name = (info.get("name") if info else None) or "학생"
         label = _label_from_guild_or_default(base_name, sid)
 
         # 휴강
-        if e.get("cancel"):
+        if e["cancel"]:
             old_times = base_on_day.get(sid, ("", []))[1]
             old_str = ", ".join(_tl(t) for t in old_times) if old_times else "(기본 없음)"
-            canceled_lines.append(f"- {label}: {old_str} (휴강)")
+            canceled_lines.append(f"> - {label}: {old_str} (휴강)")
             continue
 
         # 변경(복수)
-        chg = e.get("changes")
-        if isinstance(chg, list) and chg:
-            pairs_fmt = []
-            for it in chg:
-                tf = parse_time_str(str(it.get("from")))
-                tt = parse_time_str(str(it.get("to")))
-                if tf and tt:
-                    pairs_fmt.append((tf, f"{_tl(tf)}→{_tl(tt)}"))
-            pairs_fmt.sort(key=lambda p: (p[0].hour, p[0].minute))
-            if pairs_fmt:
-                changed_lines.append(f"- {label}: " + ", ".join(p for _, p in pairs_fmt))
-        else:
+        if e["changes"]:
+            pairs_fmt = sorted(e["changes"], key=lambda p: (p[0].hour, p[0].minute))
+            changed_lines.append(
+                f"> - {label}: " + ", ".join(f"{_tl(tf)}→{_tl(tt)}" for tf, tt in pairs_fmt)
+            )
+        elif e["change"] is not None:
             # 단일(레거시)
-            ch = e.get("change")
-            if ch is not None:
-                tch = parse_time_str(str(ch))
-                if tch:
-                    old = base_on_day.get(sid, ("", []))[1]
-                    old_str = ", ".join(_tl(t) for t in old) if old else "(기본 없음)"
-                    changed_lines.append(f"- {label}: {old_str} → {_tl(tch)}")
-
-        # 보강
-        adds = e.get("makeup") or []
-        add_times = []
-        for a in adds:
-            ta = parse_time_str(str(a))
-            if ta:
-                add_times.append(ta)
-        add_times = sorted(set(add_times), key=lambda t: (t.hour, t.minute))
-        if add_times:
-            makeup_lines.append(f"- {label}: " + ", ".join(_tl(t) for t in add_times))
+            old = base_on_day.get(sid, ("", []))[1]
+            old_str = ", ".join(_tl(t) for t in old) if old else "(기본 없음)"
+            changed_lines.append(f"> - {label}: {old_str} → {_tl(e['change'])}")
+
+        # 보강 (파싱 캐시에서 이미 dedup·정렬됨)
+        if e["makeup"]:
+            makeup_lines.append(f"> - {label}: " + ", ".join(_tl(t) for t in e["makeup"]))
 
     # ===== 여기서부터 출석 + 숙제 제출 정보 합치기 =====
 
     # 최종 세션
     effective = await effective_sessions_for(day, parsed)
-    attended_ids = set(attendance.get(day_iso, []))
+    attended_ids = _attended_set(day_iso)
 
     # 숙제 제출 정보 (새 형식: {"submitted":[sid,...]} 기준)
     raw_hw = homework.get(day_iso)
     submitted_ids = _extract_submitted_sids(raw_hw, allow_legacy_list=True)
 
     eff_lines = []
-    for n, t, sid in sorted(
-        ((n, t, sid) for (n, t, sid) in effective if isinstance(sid, int)),
-        key=lambda x: (_label_from_guild_or_default(x[0], x[2]), x[1]),
-    ):
-        label = _label_from_guild_or_default(n, sid)
-
-        # ⏰ D-day 태그 (모든 학생 대상)
-        dday_tag = ""
-        if isinstance(sid, int) and sid in dday_map:
-            remain = dday_map[sid]
-            if remain == 0:
-                dday_tag = " (D-DAY)"
-            else:
-                dday_tag = f" (D-{remain})"
+    # 라벨은 정렬 키와 본문에서 두 번 쓰므로 세션당 한 번만 계산해 둡니다.
+    eff_rows = [(_label_from_guild_or_default(n, sid), t, sid)
+                for (n, t, sid) in effective if isinstance(sid, int)]
+    eff_rows.sort(key=lambda x: (x[0], x[1]))
+    for label, t, sid in eff_rows:
+        # ⏰ D-day 태그 (모든 학생 대상, 맵에 미리 포맷되어 있음)
+        dday_tag = dday_map.get(sid, "")
 
         # 출석 여부
         att_mark = "✅ 출석" if sid in attended_ids else "❌ 미출석"
         # 숙제 여부
         hw_mark = "📘 숙제제출" if sid in submitted_ids else "🕒 미제출"
         eff_lines.append(
-            f"- {label}{dday_tag}: {t.strftime('%H:%M')} [{att_mark} / {hw_mark}]"
+            f"> - {label}{dday_tag}: {t.strftime('%H:%M')} [{att_mark} / {hw_mark}]"
         )
         
     # (요약용 통계 — 필요없으면 이 블록 통째로 지워도 됨)
@@ -841,45 +1410,62 @@ async def build_timetable_message(day: date) -> str:
     att_rate = int(round(att_cnt * 100 / total)) if total > 0 else 0
     hw_rate = int(round(hw_cnt * 100 / total)) if total > 0 else 0
 
-    lines = [f"**[수업 집계] ({day_iso})**", ""]
+    # "> " 인용 접두는 각 줄을 만들 때 이미 붙어 있으므로 join 한 번이면 끝
+    lines = [f"> **[수업 집계] ({day_iso})**", "> "]
 
     # 보강
-    lines.append("**📌 보강**" if makeup_lines else "**📌 보강**: 없음")
+    lines.append("> **📌 보강**" if makeup_lines else "> **📌 보강**: 없음")
     lines += (sorted(makeup_lines) if makeup_lines else [])
-    lines.append("")
+    lines.append("> ")
 
     # 변경
-    lines.append("**🔄 변경**" if changed_lines else "**🔄 변경**: 없음")
+    lines.append("> **🔄 변경**" if changed_lines else "> **🔄 변경**: 없음")
     lines += (sorted(changed_lines) if changed_lines else [])
-    lines.append("")
+    lines.append("> ")
 
     # 휴강
-    lines.append("**⛔ 휴강**" if canceled_lines else "**⛔ 휴강**: 없음")
+    lines.append("> **⛔ 휴강**" if canceled_lines else "> **⛔ 휴강**: 없음")
     lines += (sorted(canceled_lines) if canceled_lines else [])
-    lines.append("")
+    lines.append("> ")
 
     # 출석/숙제 요약
-    lines.append("**📊 출석·숙제 요약**")
-    lines.append(f"- 출석: {att_cnt}/{total}명 ({att_rate}%)")
-    lines.append(f"- 숙제: {hw_cnt}/{total}명 ({hw_rate}%)")
-    lines.append("")
+    lines.append("> **📊 출석·숙제 요약**")
+    lines.append(f"> - 출석: {att_cnt}/{total}명 ({att_rate}%)")
+    lines.append(f"> - 숙제: {hw_cnt}/{total}명 ({hw_rate}%)")
+    lines.append("> ")
 
     # 최종 수업
-    lines.append("**🗓️ 수업 (최종)**" if eff_lines else "**🗓️ 수업 (최종)**: 없음")
+    lines.append("> **🗓️ 수업 (최종)**" if eff_lines else "> **🗓️ 수업 (최종)**: 없음")
     lines += eff_lines
 
-    out = "\n".join("> " + L for L in lines)
+    out = "\n".join(lines)
+    _timetable_cache[day_iso] = (nowm, _ov_version, parsed, out)
     return out
 
 async def post_today_summary():
-    ch = await _get_text_channel_cached(SITUATION_ROOM_CHANNEL_ID)
+    ch = await _situation_room()
     if not ch: return
     out = (await build_timetable_message(datetime.now(KST).date()) or "").strip() or "> **[수업 집계]**\n> (내용 없음)"
     await send_long(ch, out)
 
+async def _situation_room() -> Optional[discord.TextChannel]:
+    """상황실 채널 핸들. 고정 ID라 한 번 찾으면 bot 속성에 들고 있고,
+    채널 삭제 이벤트에서만 무효화합니다. (알림마다 dict 조회+isinstance 생략)"""
+    ch = getattr(bot, "_situation_room", None)
+    if ch is not None:
+        return ch
+    ch = await _get_text_channel_cached(SITUATION_ROOM_CHANNEL_ID)
+    if ch:
+        bot._situation_room = ch
+    return ch
+
+async def _teacher_user() -> Optional[discord.User]:
+    """부팅 때 받아둔 선생님 User 재사용. 없을 때만 캐시 조회로 폴백."""
+    return getattr(bot, "_teacher_user", None) or await _get_user_cached(TEACHER_MAIN_ID)
+
 async def post_day_summary_to_teacher(day: date):
     if not TEACHER_MAIN_ID: return
-    u = await _get_user_cached(TEACHER_MAIN_ID)
+    u = await _teacher_user()
     if not u: return
     out = (await build_timetable_message(day) or "").strip() or "> **[수업 집계]**\n> (내용 없음)"
     await send_long(u, out)
@@ -887,17 +1473,45 @@ async def post_day_summary_to_teacher(day: date):
 # ====== Alerts / Homework (원형 유지, 핵심 로직은 ID 기반) ======
 ALERT_OFFSETS = (-10, 75)
 rel_tasks: Dict[Tuple[Optional[int], int, str, int], asyncio.Task] = {}
-last_question_at: Dict[int, float] = {}
+# (day_iso, offset) → key 집합. 취소 시 전체 rel_tasks를 훑지 않기 위한 보조 인덱스.
+rel_tasks_by_day_offset: Dict[Tuple[str, int], Set[tuple]] = defaultdict(set)
+
+class PerUserRateLimiter:
+    """(uid, 버킷)별 쿨다운. 무한히 자라던 last_question_at dict 대신
+    OrderedDict LRU로 상한을 두고, 버킷별로 다른 윈도우를 허용합니다."""
+    def __init__(self, max_entries: int = 10_000):
+        self._last: "OrderedDict[Tuple[int, str], float]" = OrderedDict()
+        self._max = max_entries
+
+    def acquire(self, uid: int, bucket: str, window_s: float) -> Optional[float]:
+        """허용이면 None, 아니면 남은 대기 시간(초)."""
+        now = asyncio.get_running_loop().time()
+        key = (uid, bucket)
+        last = self._last.get(key)
+        if last is not None and (now - last) < window_s:
+            return window_s - (now - last)
+        self._last[key] = now
+        self._last.move_to_end(key)
+        while len(self._last) > self._max:
+            self._last.popitem(last=False)
+        return None
+
+CALL_TEACHER_RATE = PerUserRateLimiter()
+
+def _rel_task_put(key: tuple, task: asyncio.Task):
+    rel_tasks[key] = task
+    rel_tasks_by_day_offset[(key[2], key[3])].add(key)
 
 def _cancel_rel_tasks_for(day_iso: str, offset_min: Optional[int] = None):
-    to_cancel = []
-    for key, task in list(rel_tasks.items()):
-        _sid, _hhmm, _day, _off = key
-        if _day != day_iso: continue
-        if offset_min is not None and _off != offset_min: continue
-        to_cancel.append(key)
-        if task and not task.done(): task.cancel()
-    for k in to_cancel: rel_tasks.pop(k, None)
+    if offset_min is not None:
+        groups = [(day_iso, offset_min)]
+    else:
+        groups = [g for g in rel_tasks_by_day_offset.keys() if g[0] == day_iso]
+    for g in groups:
+        for key in rel_tasks_by_day_offset.pop(g, set()):
+            task = rel_tasks.pop(key, None)
+            if task and not task.done():
+                task.cancel()
 
 async def _fire_relative(name: str, sid: Optional[int], start_time: dtime, fire_at: datetime, offset_min: int):
     try:
@@ -917,7 +1531,7 @@ async def _fire_relative(name: str, sid: Optional[int], start_time: dtime, fire_
         if ch:
             try: await ch.send(msg_student)
             except Exception: pass
-        room = await _get_text_channel_cached(SITUATION_ROOM_CHANNEL_ID)
+        room = await _situation_room()
         if room:
             try: await room.send(log)
             except Exception: pass
@@ -926,12 +1540,13 @@ async def _fire_relative(name: str, sid: Optional[int], start_time: dtime, fire_
     except Exception as e:
         print(f"[REL{offset_min}] 오류: {e}")
 
-async def schedule_relative_alerts_for_today(offset_min: int):
-    today = datetime.now(KST).date()
+async def schedule_relative_alerts_for_today(offset_min: int, sessions=None, *, now: Optional[datetime] = None):
+    now = now or datetime.now(KST)
+    today = now.date()
     today_iso = today.isoformat()
-    sessions = await effective_sessions_for(today)
+    if sessions is None:
+        sessions = await effective_sessions_for_cached(today)
     _cancel_rel_tasks_for(today_iso, offset_min)
-    now = datetime.now(KST)
     for name, t, sid in sessions:
         start_dt = datetime.combine(today, t, KST)
         fire_at  = start_dt + timedelta(minutes=offset_min)
@@ -940,80 +1555,118 @@ async def schedule_relative_alerts_for_today(offset_min: int):
         key = (sid if isinstance(sid,int) else None, hhmm, today_iso, offset_min)
         old = rel_tasks.get(key)
         if old and not old.done(): old.cancel()
-        rel_tasks[key] = asyncio.create_task(_fire_relative(name, sid, t, fire_at, offset_min))
+        _rel_task_put(key, asyncio.create_task(_fire_relative(name, sid, t, fire_at, offset_min)))
 
 async def schedule_all_offsets_for_today():
+    # 세션/현재시각은 한 번만 구해 모든 오프셋에 공유
+    now = datetime.now(KST)
+    sessions = await effective_sessions_for_cached(now.date())
     for off in ALERT_OFFSETS:
-        await schedule_relative_alerts_for_today(off)
+        await schedule_relative_alerts_for_today(off, sessions, now=now)
 
 # ====== Schedulers ======
-async def daily_scheduler():
-    await bot.wait_until_ready()
-    while not bot.is_closed():
+async def _sleep_until(target: datetime):
+    """target(KST) 시각까지 대기.
+    sleep이 일찍 깨어나도(클럭 해상도·지연 누적) 잔여 시간을 재계산해
+    다시 자므로 이른 발화/드리프트가 없습니다."""
+    while True:
+        remain = (target - datetime.now(KST)).total_seconds()
+        if remain <= 0:
+            return
+        # 1ms 하한: 잔여가 클럭 해상도 밑으로 내려가도 busy-loop이 되지 않게
+        await asyncio.sleep(max(remain, 0.001))
+
+class CronScheduler:
+    """매일 지정 시각(KST)에 코루틴을 실행하는 단일 스케줄러.
+    작업별 while-sleep 루프 여러 개 대신 heap 하나로 다음 발화만 기다리므로
+    이벤트당 wakeup 1회, 기동 태스크도 1개입니다."""
+    def __init__(self):
+        self._heap: list = []   # (발화시각, seq, 시각, 이름, 코루틴 팩토리)
+        self._seq = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _next_occurrence(at: dtime) -> datetime:
         now = datetime.now(KST)
-        target = datetime.combine(now.date(), dtime(13,0), KST)
-        if now > target: target += timedelta(days=1)
-        await asyncio.sleep(max(0,(target - now).total_seconds()))
-        try:
-            await refresh_student_id_map()
-            await post_today_summary()
-            print("[13:00] 집계 전송 완료")
-        except Exception as e:
-            print(f"[13시 집계 오류] {type(e).__name__}: {e}")
+        cand = datetime.combine(now.date(), at, KST)
+        if cand <= now:
+            cand += timedelta(days=1)
+        return cand
+
+    def add_daily(self, at: dtime, name: str, factory):
+        heapq.heappush(self._heap, (self._next_occurrence(at), self._seq, at, name, factory))
+        self._seq += 1
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        await bot.wait_until_ready()
+        while not bot.is_closed():
+            if not self._heap:
+                await asyncio.sleep(60)
+                continue
+            when, seq, at, name, factory = heapq.heappop(self._heap)
+            await _sleep_until(when)
+            try:
+                asyncio.create_task(factory())
+            except Exception as e:
+                print(f"[스케줄러 {name} 기동 오류] {type(e).__name__}: {e}")
+            heapq.heappush(self._heap, (self._next_occurrence(at), seq, at, name, factory))
 
-async def midnight_scheduler():
-    await bot.wait_until_ready()
-    while not bot.is_closed():
-        now = datetime.now(KST)
-        target = datetime.combine(now.date(), dtime(0,0), KST)
-        if now >= target: target += timedelta(days=1)
-        await asyncio.sleep((target - now).total_seconds())
+CRON = CronScheduler()
 
-        base = datetime.now(KST).date()
-        y = base - timedelta(days=1)
-        try:
-            await post_day_summary_to_teacher(y)
-        except Exception as e:
-            print(f"[자정 DM 오류] {type(e).__name__}: {e}")
+async def _job_13h_summary():
+    try:
+        await refresh_student_id_map()
+        await post_today_summary()
+        print("[13:00] 집계 전송 완료")
+    except Exception as e:
+        print(f"[13시 집계 오류] {type(e).__name__}: {e}")
+
+async def _job_midnight_rollover():
+    _sessions_cache.clear()  # 날짜가 바뀌었으니 하루치 세션 캐시 리셋
 
+    base = datetime.now(KST).date()
+    y = base - timedelta(days=1)
+
+    # 어제 DM과 학생맵 새로고침은 서로 독립이라 겹쳐 돌립니다.
+    # (집계/예약은 새 학생맵을 써야 하므로 새로고침 뒤에)
+    async def _logged(tag, coro):
         try:
-            await refresh_student_id_map()
-            await post_today_summary()
-            await schedule_all_offsets_for_today()
-            print("[00:00] 새로고침 완료")
+            await coro
         except Exception as e:
-            print(f"[자정 새로고침/예약 오류] {type(e).__name__}: {e}")
-
-async def homework_scheduler():
-    """
-    매일 18:00, 22:00 KST에 _send_homework_reminders() 실행
-    """
-    await bot.wait_until_ready()
-    targets = (dtime(18, 0), dtime(22, 0))
+            print(f"[{tag} 오류] {type(e).__name__}: {e}")
 
-    while not bot.is_closed():
-        now = datetime.now(KST)
+    await asyncio.gather(
+        _logged("자정 DM", post_day_summary_to_teacher(y)),
+        _logged("자정 학생맵", refresh_student_id_map()),
+    )
+    await asyncio.gather(
+        _logged("자정 집계", post_today_summary()),
+        _logged("자정 예약", schedule_all_offsets_for_today()),
+    )
+    print("[00:00] 새로고침 완료")
 
-        # 오늘 남은 트리거 계산
-        today_triggers = []
-        for tt in targets:
-            cand = datetime.combine(now.date(), tt, KST)
-            if cand > now:
-                today_triggers.append(cand)
-        if not today_triggers:
-            # 오늘 다 지났으면 내일 18:00
-            nxt = datetime.combine(now.date() + timedelta(days=1), targets[0], KST)
-        else:
-            nxt = min(today_triggers)
+    try:
+        removed = prune_old_homework()
+        if removed:
+            await save_homework()
+            print(f"[00:00] 오래된 숙제 기록 {removed}건 정리")
+    except Exception as e:
+        print(f"[자정 숙제정리 오류] {type(e).__name__}: {e}")
 
-        await asyncio.sleep(max(0, (nxt - now).total_seconds()))
-        try:
-            await _send_homework_reminders(nxt.hour)  # 18 또는 22
-        except Exception as e:
-            print(f"[숙제 리마인더 오류] {type(e).__name__}: {e}")
-        # 다음 루프에서 다시 계산
+async def _job_homework_reminder(hour: int):
+    try:
+        await _send_homework_reminders(hour)
+    except Exception as e:
+        print(f"[숙제 리마인더 오류] {type(e).__name__}: {e}")
 
 # ====== Slash: 출석/선생님/숙제 ======
+# 학생용 명령은 호출 채널의 카테고리명이 아니라 inter.user.id 로 학생을
+# 식별합니다. 카테고리명 파싱/검증 블록이 없으므로 CATEGORY_SUFFIX 는
+# 채널 생성(/신규)과 채널 탐색에서만 쓰입니다.
 @bot.tree.command(name="출석", description="오늘자 출석을 기록합니다.")
 @app_commands.guild_only()
 async def slash_attend(inter: discord.Interaction):
@@ -1033,8 +1686,9 @@ async def slash_attend(inter: discord.Interaction):
             arr.append(uid)
             attendance[today_iso] = arr
 
-            # 🔹 출석 저장 전담 함수 사용
-            await save_attendance()
+        # 저장 예약은 디바운스 태스크만 걸 뿐이라 락 밖에서 해도 되고,
+        # 그래야 동시 /출석 이 락에서 바로 빠져나갑니다.
+        await save_attendance()
 
         await inter.followup.send(
             f"{inter.user.mention} ✅ 출석 완료! (기록됨)",
@@ -1051,13 +1705,10 @@ async def slash_attend(inter: discord.Interaction):
 async def slash_call_teacher(inter: discord.Interaction, message: Optional[str] = None):
     await inter.response.defer(ephemeral=False, thinking=True)
     uid = inter.user.id
-    now_m = asyncio.get_running_loop().time()
-    last = last_question_at.get(uid, 0.0)
-    if now_m - last < 60:
+    if CALL_TEACHER_RATE.acquire(uid, "call", 60) is not None:
         await inter.followup.send("조금 전에도 호출이 있었어요. 1분 후에 다시 시도해주세요 🙏", ephemeral=False); return
-    last_question_at[uid] = now_m
 
-    room = await _get_text_channel_cached(SITUATION_ROOM_CHANNEL_ID)
+    room = await _situation_room()
     teacher_mention = f"<@{TEACHER_MAIN_ID}>" if TEACHER_MAIN_ID else "(선생님)"
     if room:
         msg = f"{teacher_mention} {inter.user.mention} — 선생님 호출"
@@ -1075,17 +1726,20 @@ async def slash_hw_submit(inter: discord.Interaction, when: Optional[str] = None
     today = now.date()
     desired_day: Optional[date] = None
 
+    # 시트는 한 번만 받아두고, 날짜 루프는 동기 본체로 돕니다 (날짜당 await 제거)
+    parsed = await SHEET_CACHE.get_parsed()
+
     # 1) 날짜 결정 로직 (기존 그대로 사용)
     if not when:
         # 오늘 남은 수업 있으면 오늘, 아니면 이후 첫 수업
         for i in range(0, 31):
             d = today + timedelta(days=i)
-            sessions = await effective_sessions_for(d)
-            times = [t for n, t, sid in sessions if isinstance(sid, int) and sid == uid]
-            if not times:
+            if not _student_has_session_on(d, uid, parsed):
                 continue
             if i == 0:
-                # 오늘: 아직 남은 수업이 있으면 오늘
+                # 오늘: 아직 남은 수업이 있으면 오늘 (시각 비교는 오늘만 필요)
+                times = [t for n, t, sid in effective_sessions_for_sync(d, parsed)
+                         if isinstance(sid, int) and sid == uid]
                 if any((t.hour, t.minute) > (now.hour, now.minute) for t in times):
                     desired_day = d
                     break
@@ -1094,17 +1748,17 @@ async def slash_hw_submit(inter: discord.Interaction, when: Optional[str] = None
                 break
     else:
         s = when.strip()
-        if s in ("오늘", "today"):
+        if s in _TODAY_TOKENS:
             desired_day = today
-        elif s in ("내일", "tomorrow"):
+        elif s in _TMRW_TOKENS:
             for i in range(1, 31 + 1):
                 d = today + timedelta(days=i)
-                if any(isinstance(sid, int) and sid == uid for _, _, sid in await effective_sessions_for(d)):
+                if _student_has_session_on(d, uid, parsed):
                     desired_day = d
                     break
         else:
             # YYYY-MM-DD / MM-DD 처리
-            if re.fullmatch(r"\d{1,2}-\d{1,2}", s):
+            if _MMDD_RE.match(s):
                 y = datetime.now(KST).year
                 mm, dd = s.split("-")
                 s = f"{y}-{mm.zfill(2)}-{dd.zfill(2)}"
@@ -1116,7 +1770,7 @@ async def slash_hw_submit(inter: discord.Interaction, when: Optional[str] = None
                     ephemeral=False,
                 )
                 return
-            if any(isinstance(sid, int) and sid == uid for _, _, sid in await effective_sessions_for(cand)):
+            if _student_has_session_on(cand, uid, parsed):
                 desired_day = cand
             else:
                 await inter.followup.send(
@@ -1144,11 +1798,12 @@ async def slash_hw_submit(inter: discord.Interaction, when: Optional[str] = None
 
             submitted.add(uid)
             homework[day_iso] = {
-                "submitted": sorted(submitted),
+                "submitted": submitted,  # 메모리상 set, 저장 시 정렬 리스트로 직렬화
             }
+            _note_homework_day(desired_day)
 
-            # 🔹 숙제 저장 전담 함수 사용
-            await save_homework()
+        # 저장 예약(디바운스)은 락 밖에서
+        await save_homework()
 
     except Exception as e:
         print(f"[/숙제 저장 오류] {type(e).__name__}: {e}")
@@ -1177,7 +1832,7 @@ async def slash_homework_status(inter: discord.Interaction, when: str = "오늘"
 
     # 2) 그 날짜에 수업 있는 학생들 계산
     try:
-        sessions = await effective_sessions_for(day)
+        sessions = await effective_sessions_for_cached(day)
     except Exception as e:
         await inter.followup.send(f"❌ 시간표 계산 실패: {type(e).__name__}: {e}", ephemeral=True)
         return
@@ -1286,7 +1941,7 @@ async def slash_new(inter: discord.Interaction, student: discord.Member, realnam
 
     # A) 둘 다 없음 → 중단
     if both_missing:
-        room = await _get_text_channel_cached(SITUATION_ROOM_CHANNEL_ID)
+        room = await _situation_room()
         if room:
             await room.send("\n".join([
                 "⛔ **신규 중단** — 시트에서 학생 정보를 찾지 못했습니다.",
@@ -1308,7 +1963,7 @@ async def slash_new(inter: discord.Interaction, student: discord.Member, realnam
             details.append("• discord_id는 있으나 **이름이 비어 있습니다.**")
         elif mapped_name != base:
             details.append(f"• discord_id는 확인되나 **이름 불일치** (시트:{mapped_name} ≠ 입력:{base})")
-        room = await _get_text_channel_cached(SITUATION_ROOM_CHANNEL_ID)
+        room = await _situation_room()
         if room:
             await room.send("\n".join([
                 "⚠️ **신규 진행(경고)** — 시트와 부분 불일치가 있습니다. 점검 부탁드립니다.",
@@ -1321,6 +1976,8 @@ async def slash_new(inter: discord.Interaction, student: discord.Member, realnam
         await inter.followup.send("✅ 시트 검증 통과(이름·ID 일치). 생성 계속합니다.", ephemeral=True)
 
     # 채널/닉네임 생성
+    # 닉네임 유일성은 '-끝4자리' 접미사가 보장하므로 길드 멤버 전수 스캔이나
+    # -1/-2 프로빙 없이 바로 사용합니다.
     preferred = final_label
     final_nick = preferred
     try:
@@ -1342,7 +1999,7 @@ async def slash_new(inter: discord.Interaction, student: discord.Member, realnam
                 t = guild.get_member(TEACHER_MAIN_ID)
                 if t: overwrites[t] = discord.PermissionOverwrite(view_channel=True, send_messages=True, connect=True, speak=True)
             category = await guild.create_category(category_name, overwrites=overwrites, reason="/신규: 학생 전용 카테고리")
-        text = discord.utils.get(category.text_channels, name=TEXT_NAME) or await guild.create_text_channel(TEXT_NAME, category=category, reason="/신규: 채팅채널")
+        text = _text_in_category(category) or await guild.create_text_channel(TEXT_NAME, category=category, reason="/신규: 채팅채널")
         discord.utils.get(category.voice_channels, name=VOICE_NAME) or await guild.create_voice_channel(VOICE_NAME, category=category, reason="/신규: 음성채널")
         # 텍스트 topic에 SID 태깅
         try:
@@ -1357,6 +2014,42 @@ async def slash_new(inter: discord.Interaction, student: discord.Member, realnam
 
     await inter.followup.send(f"✅ `{category.name}` 구성이 완료되었습니다.", ephemeral=True)
 
+# ===== Discord 전송 페이싱 =====
+class DiscordSender:
+    """리마인더처럼 한 번에 여러 채널로 나가는 전송을 위한 공용 전송기.
+    채널당 5건/5초 토큰버킷으로 버스트를 고르게 펴고,
+    429를 맞으면 Retry-After 만큼 쉬었다가 한 번 재시도합니다."""
+    def __init__(self, per_channel: int = 5, window_sec: float = 5.0, concurrency: int = 5):
+        self._sem = asyncio.Semaphore(concurrency)
+        self._stamps: Dict[int, deque] = {}
+        self._per = per_channel
+        self._window = window_sec
+
+    async def enqueue(self, dest, content: str):
+        cid = getattr(dest, "id", 0)
+        dq = self._stamps.setdefault(cid, deque())
+        loop = asyncio.get_running_loop()
+        async with self._sem:
+            while True:
+                now = loop.time()
+                while dq and now - dq[0] > self._window:
+                    dq.popleft()
+                if len(dq) < self._per:
+                    break
+                await asyncio.sleep(self._window - (now - dq[0]) + 0.01)
+            dq.append(loop.time())
+            try:
+                await dest.send(content)
+            except discord.HTTPException as e:
+                if getattr(e, "status", None) == 429:
+                    ra = _retry_after_seconds(e)
+                    await asyncio.sleep(ra if isinstance(ra, (int, float)) and ra > 0 else 1.0)
+                    await dest.send(content)
+                else:
+                    raise
+
+SENDER = DiscordSender()
+
 # ===== Homework Reminder Messages =====
 REMINDER_18H = [
     "📘 내일은 수업하는 날!\n저번 시간에 배운 내용 복습하고 숙제도 해보도록 합시다 😊\n완료하셨다면 `/숙제` 로 알려주세요!",
@@ -1384,7 +2077,7 @@ async def _send_homework_reminders(trigger_hour: int):
     target_day = today + timedelta(days=1)
     day_iso = target_day.isoformat()
 
-    sessions = await effective_sessions_for(target_day)
+    sessions = await effective_sessions_for_cached(target_day)
     candidate_sids = {sid for _, _, sid in sessions if isinstance(sid, int)}
 
 
@@ -1404,19 +2097,25 @@ async def _send_homework_reminders(trigger_hour: int):
     msg_body = _pick_homework_msg(trigger_hour)
 
     sent = 0
+    failures: List[str] = []  # 개별 실패마다 상황실에 쏘지 않고 한 번에 모아서 보고
+    sid_to_ch = _build_sid_to_channel_map() if targets else {}
     for sid in targets:
-        ch = _find_student_text_channel_by_id(sid, "학생")
+        ch = sid_to_ch.get(sid) or _find_student_text_channel_by_id(sid, "학생")
         if not ch:
+            failures.append(f"- SID:{sid} (채널 없음)")
             continue
         try:
-            await ch.send(f"<@{sid}>\n{msg_body}")
+            await SENDER.enqueue(ch, f"<@{sid}>\n{msg_body}")
             sent += 1
-        except Exception:
-            pass
+        except Exception as e:
+            failures.append(f"- SID:{sid} ({type(e).__name__})")
 
-    room = await _get_text_channel_cached(SITUATION_ROOM_CHANNEL_ID)
+    room = await _situation_room()
     if room:
-        await room.send(f"[숙제 리마인더] {trigger_hour}:00 전송 완료 — 대상 {len(targets)}명 / 실제 {sent}건 ({day_iso})")
+        summary = f"[숙제 리마인더] {trigger_hour}:00 전송 완료 — 대상 {len(targets)}명 / 실제 {sent}건 ({day_iso})"
+        if failures:
+            summary += "\n실패 목록:\n" + "\n".join(failures)
+        await send_long(room, summary)
 
 # ====== Slash: 변경/보강/휴강 — ID-only 저장 ======
 async def _after_override_commit(dt: date):
@@ -1427,7 +2126,7 @@ async def _after_override_commit(dt: date):
         except Exception as e:
             print(f"[후처리 예약 오류] {type(e).__name__}: {e}")
     try:
-        ch = await _get_text_channel_cached(SITUATION_ROOM_CHANNEL_ID)
+        ch = await _situation_room()
         if ch:
             await ch.send(await build_timetable_message(dt))
     except Exception as e:
@@ -1445,15 +2144,16 @@ async def slash_change(inter: discord.Interaction, student: discord.Member, when
     day_iso = dt.isoformat()
     try:
         async with _overrides_lock:
+            sid = student.id  # 속성 접근도 한 번만
             ovs_day = _ensure_day_bucket(day_iso)
-            ov_clear_changes_id(ovs_day, student.id)
-            ov_add_change_pair_id(ovs_day, student.id, from_time, to_time)
-            ov_set_cancel_id(ovs_day, student.id, False)
-            overrides[day_iso] = ovs_day
+            ov_clear_changes_id(ovs_day, sid)
+            ov_add_change_pair_id(ovs_day, sid, from_time, to_time)
+            ov_set_cancel_id(ovs_day, sid, False)
         await save_overrides()
     except Exception as e:
         await inter.followup.send(f"❌ 변경 저장 실패: {type(e).__name__}: {e}", ephemeral=True); return
-    await _after_override_commit(dt)
+    # 후처리(학생맵/알림 재예약/집계 재게시)는 선생님 응답을 막지 않게 백그라운드로
+    asyncio.create_task(_after_override_commit(dt))
     await inter.followup.send("✅ 변경 반영 완료.", ephemeral=True)
 
 @bot.tree.command(name="변경삭제", description="해당 날짜의 모든 변경(A→B)을 제거")
@@ -1469,11 +2169,11 @@ async def slash_change_clear(inter: discord.Interaction, student: discord.Member
             ovs_day = _ensure_day_bucket(day_iso)
             ov_clear_changes_id(ovs_day, student.id)
             _cleanup_entry_if_empty_id(ovs_day, student.id)
-            overrides[day_iso] = ovs_day
         await save_overrides()
     except Exception as e:
         await inter.followup.send(f"❌ 변경 삭제 실패: {type(e).__name__}: {e}", ephemeral=True); return
-    await _after_override_commit(dt)
+    # 후처리(학생맵/알림 재예약/집계 재게시)는 선생님 응답을 막지 않게 백그라운드로
+    asyncio.create_task(_after_override_commit(dt))
     await inter.followup.send("✅ 변경 기록을 모두 삭제했습니다.", ephemeral=True)
 
 @bot.tree.command(name="보강", description="해당 날짜에 보강 시각을 추가합니다. (예: 18:15)")
@@ -1513,14 +2213,8 @@ async def slash_makeup(inter: discord.Interaction, student: discord.Member, when
         await inter.followup.send(f"❌ 보강 추가 실패: {type(e).__name__}: {e}", ephemeral=True); return
 
     # (4) 후처리(집계 재게시 + 오늘이면 재예약까지는 _after_override_commit에서 처리)
-    try:
-        await _after_override_commit(dt)
-    except Exception as e:
-        # 후처리에 실패해도, 보강 자체는 저장되었으므로 안내만 남김
-        await inter.followup.send(
-            f"✅ 보강을 추가했습니다. (후처리 중 경고: {type(e).__name__})", ephemeral=True
-        )
-        return
+    #     선생님 응답을 막지 않게 백그라운드로 — 실패해도 보강 자체는 저장돼 있음
+    asyncio.create_task(_after_override_commit(dt))
 
     # (5) 휴강일 경고 안내
     warn = (
@@ -1548,11 +2242,11 @@ async def slash_makeup_remove_all(inter: discord.Interaction, student: discord.M
                 await inter.followup.send("ℹ️ 해당 날짜에 등록된 보강이 없습니다.", ephemeral=True); return
             e["makeup"] = []
             _cleanup_entry_if_empty_id(ovs_day, student.id)
-            overrides[day_iso] = ovs_day
         await save_overrides()
     except Exception as e:
         await inter.followup.send(f"❌ 보강 삭제 실패: {type(e).__name__}: {e}", ephemeral=True); return
-    await _after_override_commit(dt)
+    # 후처리(학생맵/알림 재예약/집계 재게시)는 선생님 응답을 막지 않게 백그라운드로
+    asyncio.create_task(_after_override_commit(dt))
     await inter.followup.send("✅ 보강 삭제 완료.", ephemeral=True)
 
 @bot.tree.command(name="휴강", description="해당 날짜 휴강 처리")
@@ -1567,11 +2261,11 @@ async def slash_cancel(inter: discord.Interaction, student: discord.Member, when
         async with _overrides_lock:
             ovs_day = _ensure_day_bucket(day_iso)
             ov_set_cancel_id(ovs_day, student.id, True)
-            overrides[day_iso] = ovs_day
         await save_overrides()
     except Exception as e:
         await inter.followup.send(f"❌ 휴강 처리 실패: {type(e).__name__}: {e}", ephemeral=True); return
-    await _after_override_commit(dt)
+    # 후처리(학생맵/알림 재예약/집계 재게시)는 선생님 응답을 막지 않게 백그라운드로
+    asyncio.create_task(_after_override_commit(dt))
     await inter.followup.send("✅ 휴강 처리 완료.", ephemeral=True)
 
 @bot.tree.command(name="휴강삭제", description="해당 날짜의 휴강 상태 해제")
@@ -1587,11 +2281,11 @@ async def slash_cancel_remove(inter: discord.Interaction, student: discord.Membe
             ovs_day = _ensure_day_bucket(day_iso)
             ov_set_cancel_id(ovs_day, student.id, False)
             _cleanup_entry_if_empty_id(ovs_day, student.id)
-            overrides[day_iso] = ovs_day
         await save_overrides()
     except Exception as e:
         await inter.followup.send(f"❌ 휴강 해제 실패: {type(e).__name__}: {e}", ephemeral=True); return
-    await _after_override_commit(dt)
+    # 후처리(학생맵/알림 재예약/집계 재게시)는 선생님 응답을 막지 않게 백그라운드로
+    asyncio.create_task(_after_override_commit(dt))
     await inter.followup.send("✅ 휴강 해제 완료.", ephemeral=True)
 
 # ====== 관리: 시간표/새로고침/로그 ======
@@ -1640,6 +2334,8 @@ async def slash_reload(inter: discord.Interaction):
     msgs = []
     try:
         SHEET_CACHE._ts = 0.0
+        _clear_fetch_caches()  # 네거티브 캐시 포함, 강제 새로고침이니 비웁니다
+        _timetable_cache.clear()
         await refresh_student_id_map()
         msgs.append("• 학생 ID맵 새로고침 완료")
     except Exception as e:
@@ -1665,7 +2361,7 @@ async def slash_log(inter: discord.Interaction, when: str = "오늘"):
     if not day: await inter.followup.send("날짜 형식 오류", ephemeral=True); return
     if not TEACHER_MAIN_ID: await inter.followup.send("❌ TEACHER_MAIN_ID 미설정", ephemeral=True); return
     try:
-        u = await _get_user_cached(TEACHER_MAIN_ID)
+        u = await _teacher_user()
         if not u: await inter.followup.send("❌ 선생님 계정 조회 실패", ephemeral=True); return
         await send_long(u, await build_timetable_message(day))
         await inter.followup.send(f"✅ `{day.isoformat()}` 집계를 선생님 DM으로 보냈습니다.", ephemeral=True)
@@ -1673,23 +2369,59 @@ async def slash_log(inter: discord.Interaction, when: str = "오늘"):
         await inter.followup.send(f"❌ 전송 실패: {type(e).__name__}: {e}", ephemeral=True)
 
 # ====== Errors ======
+# 핸들러 안에서 모듈 속성 체인(LOAD_ATTR)을 타지 않게 예외 클래스는 한 번만 바인딩
+_CmdNotFound = commands.CommandNotFound
+_AppInvokeErr = app_commands.CommandInvokeError
+# try/except 프레임 셋업 대신 C 레벨 __exit__로 삼키는 재사용 인스턴스
+_SUPPRESS_ALL = suppress(Exception)
+
 @bot.event
 async def on_command_error(ctx: commands.Context, error: commands.CommandError):
-    if isinstance(error, commands.CommandNotFound): return
-    try: await ctx.send("❌ 명령 실행 중 오류가 발생했어요. 콘솔 로그를 확인해 주세요.")
-    except Exception: pass
-    traceback.print_exception(type(error), error, error.__traceback__)
+    if isinstance(error, _CmdNotFound): return
+    with _SUPPRESS_ALL:
+        await ctx.send("❌ 명령 실행 중 오류가 발생했어요. 콘솔 로그를 확인해 주세요.")
+    # 스택 포매팅(프레임 순회+문자열 조립)은 수 ms짜리 블로킹이라
+    # 이벤트 루프 밖(기본 executor)에서 수행합니다. 출력 순서만 비결정적.
+    asyncio.get_running_loop().run_in_executor(
+        None, traceback.print_exception, type(error), error, error.__traceback__
+    )
+
+# 오류 응답은 고정 문구 + 멘션 해석 생략 (payload 빌드/서버측 resolve 절약)
+_ERR_NO_MENTIONS = discord.AllowedMentions.none()
+_APP_ERR_MSG = "⚠️ 명령 처리 중 오류가 발생했습니다. 로그를 확인할게요."
+# 오류 응답 공통 kwargs를 한 번만 만들어 재사용 (MappingProxy: 실수로 변형 방지)
+_EPHEMERAL = types.MappingProxyType({"ephemeral": True, "allowed_mentions": _ERR_NO_MENTIONS})
+
+# 자주 오는 '사용자 탓' 오류는 타입→문구 딕셔너리 1회 조회로 분기합니다.
+# (isinstance 체인 대신 정확 타입 매치 — 서브클래스는 아래 폴백 순회가 받음)
+_SLASH_STATIC_MSG = {
+    app_commands.MissingPermissions: "❌ 이 명령을 실행할 권한이 없어요.",
+    app_commands.BotMissingPermissions: "❌ 봇에게 필요한 권한이 없어요. 서버 설정을 확인해 주세요.",
+    app_commands.CheckFailure: "❌ 이 명령을 사용할 수 없는 조건입니다.",
+}
 
-@bot.tree.error
 async def on_app_command_error(inter: discord.Interaction, error: app_commands.AppCommandError):
-    original = getattr(error, "original", error)
-    try:
-        msg = "⚠️ 명령 처리 중 오류가 발생했습니다. 로그를 확인할게요."
-        if inter.response.is_done(): await inter.followup.send(msg, ephemeral=True)
-        else: await inter.response.send_message(msg, ephemeral=True)
-    finally:
+    # CommandInvokeError만 .original을 가짐 — getattr+기본값 경로보다
+    # isinstance 한 번 + 직접 속성 접근이 싸고 의도도 명확합니다.
+    original = error.original if isinstance(error, _AppInvokeErr) else error
+    msg = _SLASH_STATIC_MSG.get(type(original))
+    if msg is None:
+        # 서브클래스로 날아오는 드문 경우만 순회 (선언 순서가 우선순위)
+        for et, m in _SLASH_STATIC_MSG.items():
+            if isinstance(original, et):
+                msg = m
+                break
+    known = msg is not None
+    with _SUPPRESS_ALL:
+        sender = inter.followup.send if inter.response.is_done() else inter.response.send_message
+        await sender(msg if known else _APP_ERR_MSG, **_EPHEMERAL)
+    if not known:  # 사용자 탓 오류는 버그가 아니므로 로그를 더럽히지 않음
         print(f"[AppCommandError] {type(original).__name__}: {original}")
 
+# @bot.tree.error 데코레이터의 시그니처 검증 경로 대신 직접 대입.
+# (discord.py 2.x에서 데코레이터도 결국 self.on_error에 저장합니다)
+bot.tree.on_error = on_app_command_error
+
 # ====== Ready & Main ======
 async def _background_after_ready():
     if getattr(bot, "_post_ready_once_done", False):
@@ -1720,9 +2452,9 @@ async def _background_after_ready():
         else:
             print("[429-safe] ENABLE_SLASH_SYNC=0 → 슬래시 sync를 건너뜁니다.")
 
-        # 시트 워밍업
+        # 시트 워밍업 (batchGet 1회로 캐시 선적재)
         try:
-            await SHEET_CACHE.get_parsed()
+            await SHEET_CACHE.warmup()
             print("[워밍업] 시트 캐시 준비 완료")
         except Exception as e:
             print("[워밍업 실패] PermissionError repr:", repr(e))
@@ -1745,6 +2477,20 @@ async def on_ready():
             return
 
         # 부팅시 맵/마이그레이션
+        try:
+            _refresh_member_cache()
+            _index_guild_channels()
+        except Exception as e:
+            print(f"[부팅 멤버캐시 오류] {type(e).__name__}: {e}")
+
+        # 선생님 User / 상황실 채널은 고정 ID라 부팅 때 한 번만 조회해 둡니다.
+        try:
+            bot._teacher_user = await _get_user_cached(TEACHER_MAIN_ID)
+            await _situation_room()
+        except Exception as e:
+            bot._teacher_user = None
+            print(f"[부팅 선생님조회 오류] {type(e).__name__}: {e}")
+
         try:
             await refresh_student_id_map()
         except Exception as e:
@@ -1766,10 +2512,12 @@ async def on_ready():
         # 스케줄러 일괄 기동 (중복 방지)
         if not getattr(bot, "_sched_start", False):
             bot._sched_start = True
-            asyncio.create_task(daily_scheduler())      # 13:00 집계
-            asyncio.create_task(midnight_scheduler())   # 자정 집계/예약
-            asyncio.create_task(homework_scheduler())   # 18:00 / 22:00 숙제 리마인더
-            print("[스케줄러] daily + midnight + homework(18/22시) 시작")
+            CRON.add_daily(dtime(13, 0), "13시 집계", _job_13h_summary)
+            CRON.add_daily(dtime(0, 0), "자정 롤오버", _job_midnight_rollover)
+            CRON.add_daily(dtime(18, 0), "숙제 18시", lambda: _job_homework_reminder(18))
+            CRON.add_daily(dtime(22, 0), "숙제 22시", lambda: _job_homework_reminder(22))
+            CRON.start()
+            print("[스케줄러] CRON 시작 (00/13/18/22시)")
 
         # 슬래시 sync + 시트 워밍업은 1회 비동기 실행
         if not getattr(bot, "_post_ready_task_started", False):
@@ -1779,14 +2527,37 @@ async def on_ready():
         bot._boot_once_done = True
 
 # Health server (Render 등)
+HEALTH_PORT = int(ENV("PORT") or "10000")
+
+class _HealthProto(asyncio.Protocol):
+    # "ok"만 돌려주는 프로브에 aiohttp Application/Request/Response 한 벌은
+    # 과합니다. 미리 구워둔 바이트를 그대로 쓰는 최소 프로토콜로 대체 —
+    # 요청당 힙 할당 없이 write+close만 수행합니다.
+    _RESP = (b"HTTP/1.1 200 OK\r\n"
+             b"Content-Type: text/plain\r\n"
+             b"Content-Length: 2\r\n"
+             b"Connection: close\r\n"
+             b"\r\nok")
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        if data.startswith(b"GET "):
+            self.transport.write(self._RESP)
+        self.transport.close()
+
 async def _start_health_server():
-    port = int(os.environ.get("PORT", "10000"))
-    from aiohttp import web
-    async def handle(_): return web.Response(text="ok")
-    app = web.Application(); app.router.add_get("/", handle); app.router.add_get("/healthz", handle)
-    runner = web.AppRunner(app); await runner.setup()
-    site = web.TCPSite(runner, "0.0.0.0", port); await site.start()
-    print(f"[health] listening on :{port}")
+    loop = asyncio.get_running_loop()
+    try:
+        # reuse_port: 수평 확장 시 커널이 accept 큐를 워커별로 분산 (Linux 전용)
+        server = await loop.create_server(
+            _HealthProto, "0.0.0.0", HEALTH_PORT, reuse_port=True, backlog=128
+        )
+    except (ValueError, OSError):
+        server = await loop.create_server(_HealthProto, "0.0.0.0", HEALTH_PORT, backlog=128)
+    bot._health_server = server  # 참조 유지
+    print(f"[health] listening on :{HEALTH_PORT}")
 
 async def _heartbeat():
     # 주기적으로 살아있음을 출력해 로그가 비어보이는 문제를 줄입니다.
@@ -1797,13 +2568,41 @@ async def _heartbeat():
             pass
         await asyncio.sleep(max(5, HEARTBEAT_INTERVAL_SEC))
 
+async def _graceful_shutdown(stop: asyncio.Event):
+    # 시그널이 오면 bot.close()로 게이트웨이를 정리 → bot.start가 정상 반환되어
+    # _main이 깨끗하게 끝납니다. (예외 되감기 없이 루프가 바로 select()로 복귀)
+    await stop.wait()
+    print("[종료] SIGTERM/SIGINT 수신 — 연결을 정리하고 내려갑니다")
+    try:
+        await bot.close()
+    except Exception as e:
+        print(f"[종료] bot.close 중 오류(무시): {type(e).__name__}: {e}")
+
 async def _main():
-    asyncio.create_task(_start_health_server())
-    asyncio.create_task(_heartbeat())
+    # 3.12+: 태스크를 첫 suspend까지 인라인 실행해 짧은 핸들러의
+    # ready-queue 왕복을 없앱니다. (구버전/미지원 루프면 그대로 둠)
+    if hasattr(asyncio, "eager_task_factory"):
+        try:
+            asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
+        except Exception as e:
+            print(f"[eager task factory 미적용] {type(e).__name__}: {e}")
+
+    # Render는 컨테이너 킬(137) 전에 SIGTERM을 보냅니다. KeyboardInterrupt
+    # 되감기 대신 이벤트만 set하는 핸들러를 걸어 종료를 빠르고 조용하게.
+    stop = asyncio.Event()
+    try:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        asyncio.create_task(_graceful_shutdown(stop))
+    except (NotImplementedError, RuntimeError):
+        pass  # Windows 등: __main__의 KeyboardInterrupt 폴백 사용
+
+    asyncio.create_task(_heartbeat())  # 보조 로그: 수명 관리 불필요
 
     # Firestore 초기화 + 데이터 로드
     init_firestore_client(SERVICE_ACCOUNT_JSON)
-    load_from_firestore_or_local()
+    await load_from_firestore_or_local()
 
     print(
         f"[429-safe] SAFE_MODE_429={int(SAFE_MODE_429)} "
@@ -1811,9 +2610,26 @@ async def _main():
         f"BACKOFF={RATE_LIMIT_WAIT_MIN}-{RATE_LIMIT_WAIT_MAX}min"
     )
 
-    if not BOT_TOKEN:
-        raise SystemExit("❌ BOT_TOKEN이 비어있습니다.")
+    # 헬스서버 기동 실패(포트 점유 등)가 로그인과 묶여 바로 드러나도록
+    # TaskGroup으로 구조화합니다. (헬스서버 코루틴은 site.start 후 반환)
+    if hasattr(asyncio, "TaskGroup"):
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(_start_health_server())
+            tg.create_task(_login_with_backoff())
+    else:
+        asyncio.create_task(_start_health_server())
+        await _login_with_backoff()
 
+    # 여기 도달 = bot.start가 반환(시그널 종료 포함)된 뒤입니다.
+    # asyncio.run이 태스크를 걷어가기 전에, 디바운스에 걸려 있던 저장을
+    # 마지막으로 내려 재배포(SIGTERM)마다 최근 0.5초의 변경이 증발하지 않게.
+    try:
+        await _flush_pending_saves()
+    except Exception as e:
+        print(f"[종료] 저장 플러시 실패: {type(e).__name__}: {e}")
+    _persist_executor.shutdown(wait=True)
+
+async def _login_with_backoff():
     attempt = 0
 
     # ✅ 429 자동복구: 매우 느린 재시도(백오프)
@@ -1861,6 +2677,10 @@ async def _main():
             raise  # 429가 아니면 그대로 터뜨려서 원인 확인
 
 if __name__ == "__main__":
+    # 토큰 검증은 루프를 띄우기 전에: _main을 분기 없는 짧은 코루틴으로
+    # 유지하고, 설정 실수는 이벤트 루프 비용 없이 즉시 실패시킵니다.
+    if not BOT_TOKEN:
+        raise SystemExit("❌ BOT_TOKEN이 비어있습니다. .env 파일/환경변수를 설정하세요.")
     try:
         asyncio.run(_main())
     except KeyboardInterrupt: